@@ -0,0 +1,85 @@
+from checkers.board import Board
+
+# Fixed benchmark corpus. Diagrams list rows 0-9 top to bottom: r/w men, R/W kings,
+# '#' marks the holes at (4,1), (4,5), (5,2), (5,6). WHITE moves down, RED moves up.
+CORPUS = {
+    "opening": {
+        "rows": None,
+        "boost": {"RED": True, "WHITE": True},
+    },
+    "midgame_kings": {
+        "rows": [
+            ".w.w...w..",
+            "w.....w...",
+            ".w.W.w...w",
+            "..r.......",
+            ".#...#.w..",
+            "..#...#.r.",
+            ".r.R.r....",
+            "r.....r.R.",
+            ".r...r...r",
+            "..........",
+        ],
+        "boost": {"RED": False, "WHITE": False},
+    },
+    "near_holes": {
+        "rows": [
+            "..........",
+            "..w...w...",
+            "...w.w....",
+            "w...w.w...",
+            ".#.r.#.w.r",
+            "w.#.r.#.r.",
+            ".r.r...r..",
+            "..r...r...",
+            "..........",
+            "..........",
+        ],
+        "boost": {"RED": False, "WHITE": False},
+    },
+    "boost_available": {
+        "rows": [
+            ".w.w.w.w.w",
+            "w...w...w.",
+            ".w.......w",
+            "..w...w...",
+            ".#...#....",
+            "..#.r.#...",
+            "...r...r..",
+            "r.....r...",
+            ".r.r.r.r.r",
+            "r.r.r.r.r.",
+        ],
+        "boost": {"RED": True, "WHITE": True},
+    },
+    "endgame_kings": {
+        "rows": [
+            "..........",
+            "..W.......",
+            "..........",
+            "....R.....",
+            ".#...#....",
+            "..#...#...",
+            ".......W..",
+            "..R.......",
+            ".....r....",
+            "..........",
+        ],
+        "boost": {"RED": True, "WHITE": False},
+    },
+}
+
+
+def load_position(name):
+    spec = CORPUS[name]
+    if spec["rows"] is None:
+        board = Board()
+        for side, available in spec["boost"].items():
+            if not available:
+                board.use_boost(side)
+        return board
+    return Board.from_rows(spec["rows"], spec["boost"])
+
+
+def corpus():
+    return [(name, load_position(name)) for name in CORPUS]
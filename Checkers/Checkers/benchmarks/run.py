@@ -0,0 +1,149 @@
+import argparse
+import json
+import platform
+import time
+
+from checkers import batch
+from checkers.bitboard import BitBoard
+from checkers.constants import RED, WHITE
+from minimax.algorithm import minimax, get_all_moves
+from minimax.ordering import MoveOrdering
+from minimax.transposition import TranspositionTable
+from .positions import CORPUS, corpus
+
+
+BATCH_SIZE = 4096
+
+
+def _side_moves(board, max_player):
+    color, side = (WHITE, "WHITE") if max_player else (RED, "RED")
+    return get_all_moves(board, color, board.boost_available[side],
+                         boost_used=not board.boost_available[side])
+
+
+# Leaf count of the search's move tree (boost included, no twice follow-ups),
+# walked with make_move/unmake_move on the one board.
+def count_nodes(board, max_player, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move, _ in _side_moves(board, max_player):
+        tokens = [board.make_move(step) for step in move]
+        nodes += count_nodes(board, not max_player, depth - 1)
+        for token in reversed(tokens):
+            board.unmake_move(token)
+    return nodes
+
+
+# Calls per second of fn, repeated until at least min_seconds have passed
+def _rate(fn, min_seconds):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def bench_position(board, max_player=True, perft_depth=3, search_depth=4, min_seconds=0.2):
+    result = {}
+
+    perft = []
+    for depth in range(1, perft_depth + 1):
+        start = time.perf_counter()
+        nodes = count_nodes(board, max_player, depth)
+        elapsed = time.perf_counter() - start
+        perft.append({"depth": depth, "nodes": nodes, "seconds": round(elapsed, 4),
+                      "nodes_per_sec": round(nodes / elapsed) if elapsed else None})
+    result["perft"] = perft
+
+    move_count = len(_side_moves(board, max_player))
+    result["moves"] = move_count
+    result["movegen_per_sec"] = round(_rate(lambda: _side_moves(board, max_player), min_seconds))
+    result["moves_per_sec"] = round(result["movegen_per_sec"] * move_count)
+
+    bitboard = BitBoard.from_board(board)
+    result["bitboard_movegen_per_sec"] = round(_rate(lambda: _side_moves(bitboard, max_player), min_seconds))
+
+    result["evals_per_sec"] = round(_rate(board.evaluate, min_seconds))
+    boost_flags = board.boost_available
+    result["bitboard_evals_per_sec"] = round(_rate(lambda: bitboard.evaluate(boost_flags), min_seconds))
+    result["full_evals_per_sec"] = round(_rate(board.full_evaluate, min_seconds))
+    if batch.np is not None:
+        # positions scored per second by BatchEvaluator over a stack of BATCH_SIZE copies
+        evaluator = batch.BatchEvaluator()
+        positions, boost = batch.encode_boards([board] * BATCH_SIZE)
+        result["batch_evals_per_sec"] = round(
+            _rate(lambda: evaluator.evaluate(positions, boost), min_seconds) * BATCH_SIZE)
+
+    # the same searches on the Board and on the BitBoard the engine searches with
+    for key, position in (("time_to_depth", board), ("bitboard_time_to_depth", bitboard)):
+        time_to_depth = []
+        for depth in range(1, search_depth + 1):
+            ordering = MoveOrdering()
+            start = time.perf_counter()
+            minimax(position, depth, max_player, tt=TranspositionTable(), ordering=ordering)
+            elapsed = time.perf_counter() - start
+            time_to_depth.append({"depth": depth, "seconds": round(elapsed, 4), "nodes": ordering.nodes,
+                                  "nodes_per_sec": round(ordering.nodes / elapsed) if elapsed else None})
+        result[key] = time_to_depth
+    return result
+
+
+def run(perft_depth=3, search_depth=4, min_seconds=0.2, names=None):
+    positions = {}
+    for name, board in corpus():
+        if names and name not in names:
+            continue
+        positions[name] = bench_position(board, True, perft_depth, search_depth, min_seconds)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "perft_depth": perft_depth,
+        "search_depth": search_depth,
+        "positions": positions,
+    }
+
+
+# Ratios new/old for every rate and timing that both runs measured
+def compare(old, new):
+    rows = []
+    for name, result in new["positions"].items():
+        before = old["positions"].get(name)
+        if before is None:
+            continue
+        for key in ("movegen_per_sec", "bitboard_movegen_per_sec", "evals_per_sec", "bitboard_evals_per_sec",
+                    "full_evals_per_sec", "batch_evals_per_sec"):
+            if before.get(key) and result.get(key):
+                rows.append({"position": name, "metric": key, "old": before[key], "new": result[key],
+                             "ratio": round(result[key] / before[key], 3)})
+        for metric in ("time_to_depth", "bitboard_time_to_depth"):
+            for old_depth, new_depth in zip(before.get(metric, ()), result.get(metric, ())):
+                if old_depth["seconds"] and new_depth["seconds"]:
+                    rows.append({"position": name, "metric": f"{metric}_{new_depth['depth']}",
+                                 "old": old_depth["seconds"], "new": new_depth["seconds"],
+                                 "ratio": round(new_depth["seconds"] / old_depth["seconds"], 3)})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move generation, evaluation and search benchmarks")
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", default=None, help="earlier --out file to diff against")
+    parser.add_argument("--perft-depth", type=int, default=3)
+    parser.add_argument("--search-depth", type=int, default=4)
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    parser.add_argument("--position", action="append", choices=sorted(CORPUS))
+    args = parser.parse_args()
+
+    results = run(args.perft_depth, args.search_depth, args.min_seconds, args.position)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            for row in compare(json.load(f), results):
+                print(json.dumps(row))
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
@@ -0,0 +1,118 @@
+import argparse
+import json
+import platform
+import random
+import time
+
+from checkers.board import Board
+from checkers.constants import START_ROWS, WHITE
+from checkers.engine.state import GameState
+from checkers.geometry import get_geometry
+from minimax.algorithm import minimax
+from minimax.ordering import MoveOrdering
+from minimax.transposition import TranspositionTable
+from .run import _rate, _side_moves, count_nodes
+
+SIZES = (8, 10, 12, 14, 16)
+HOLE_COUNTS = (0, 4, 8, 16)
+
+
+# hole_count dark squares between the two starting camps, picked with a fixed seed so
+# every run measures the same layouts. None when they would take more than half of
+# those squares.
+def hole_layout(size, hole_count, start_rows=START_ROWS, seed=0):
+    middle = [(row, col) for row in range(start_rows, size - start_rows) for col in range(size)
+              if col % 2 == (row + 1) % 2]
+    if hole_count > len(middle) // 2:
+        return None
+    return sorted(random.Random(seed * 1000 + size).sample(middle, hole_count))
+
+
+# (name, board, max_player) for the opening and for the position up to plies seeded
+# random moves into the game, stopping short of a finished game
+def scaling_positions(geometry, plies=10, seed=0):
+    rng = random.Random(seed)
+    state = GameState(Board(geometry))
+    positions = [("opening", Board(geometry), state.turn == WHITE)]
+    for _ in range(plies):
+        token = state.make_move(rng.choice(state.legal_moves()))
+        if state.winner() is not None:
+            state.unmake_move(token)
+            break
+    positions.append((f"ply_{plies}", state.board, state.turn == WHITE))
+    return positions
+
+
+def bench_geometry(geometry, perft_depth=3, search_depth=4, min_seconds=0.2, plies=10):
+    result = {
+        "size": geometry.rows,
+        "holes": len(geometry.holes),
+        "open_squares": sum(1 for row in range(geometry.rows) for col in range(geometry.cols)
+                            if geometry.is_dark(row, col) and (row, col) not in geometry.hole_set),
+        "pieces_per_side": Board(geometry).red_left,
+        "positions": {},
+    }
+    for name, board, max_player in scaling_positions(geometry, plies):
+        moves = len(_side_moves(board, max_player))
+        movegen = _rate(lambda: _side_moves(board, max_player), min_seconds)
+
+        start = time.perf_counter()
+        nodes = count_nodes(board, max_player, perft_depth)
+        perft_seconds = time.perf_counter() - start
+
+        ordering = MoveOrdering()
+        start = time.perf_counter()
+        minimax(board, search_depth, max_player, tt=TranspositionTable(), ordering=ordering)
+        search_seconds = time.perf_counter() - start
+
+        result["positions"][name] = {
+            "moves": moves,
+            "movegen_per_sec": round(movegen),
+            "moves_per_sec": round(movegen * moves),
+            "perft_nodes": nodes,
+            "perft_nodes_per_sec": round(nodes / perft_seconds) if perft_seconds else None,
+            "search_nodes": ordering.nodes,
+            "search_seconds": round(search_seconds, 4),
+            "search_nodes_per_sec": round(ordering.nodes / search_seconds) if search_seconds else None,
+        }
+    return result
+
+
+def run(sizes=SIZES, hole_counts=HOLE_COUNTS, start_rows=START_ROWS, perft_depth=3, search_depth=4,
+        min_seconds=0.2, log=None):
+    configs = []
+    for size in sizes:
+        for hole_count in hole_counts:
+            holes = hole_layout(size, hole_count, start_rows)
+            if holes is None:
+                continue
+            config = bench_geometry(get_geometry(size, size, holes, start_rows), perft_depth, search_depth,
+                                    min_seconds)
+            if log:
+                log(json.dumps(config))
+            configs.append(config)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "start_rows": start_rows,
+        "perft_depth": perft_depth,
+        "search_depth": search_depth,
+        "configs": configs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move generation and search throughput by board size and hole count")
+    parser.add_argument("--out", default="scaling.json")
+    parser.add_argument("--size", type=int, action="append", help="board size (repeatable), default: %s" % (SIZES,))
+    parser.add_argument("--holes", type=int, action="append", help="hole count (repeatable), default: %s" % (HOLE_COUNTS,))
+    parser.add_argument("--start-rows", type=int, default=START_ROWS)
+    parser.add_argument("--perft-depth", type=int, default=3)
+    parser.add_argument("--search-depth", type=int, default=4)
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(args.size or SIZES, args.holes or HOLE_COUNTS, args.start_rows, args.perft_depth,
+                  args.search_depth, args.min_seconds, log=print)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
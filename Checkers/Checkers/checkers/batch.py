@@ -0,0 +1,100 @@
+from .constants import ROWS, COLS, WHITE, EVAL_WEIGHTS
+from .board import HOLE_ADJACENCY
+from .geometry import DEFAULT_GEOMETRY, PROMOTION_ROW
+from .piece import Piece
+
+# NumPy is optional: only batch evaluation needs it (pip install numpy)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Positions are rows of the 50 dark squares in board order, one int8 code per square:
+# 0 empty (or a hole), +1/+2 WHITE man/king, -1/-2 RED man/king. Boost flags travel
+# alongside as an N x 2 bool array of (RED, WHITE).
+PLAYABLE_SQUARES = [(row, col) for row in range(ROWS) for col in range(COLS) if col % 2 == (row + 1) % 2]
+SQUARE_INDEX = {square: index for index, square in enumerate(PLAYABLE_SQUARES)}
+MAN, KING = 1, 2
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("batch evaluation needs NumPy: pip install numpy")
+
+
+def piece_code(piece):
+    code = KING if piece.king else MAN
+    return code if piece.color == WHITE else -code
+
+
+def encode(board):
+    _require_numpy()
+    if board.geometry is not DEFAULT_GEOMETRY:
+        raise ValueError("batch encoding only covers the standard board")
+    position = np.zeros(len(PLAYABLE_SQUARES), dtype=np.int8)
+    for index, (row, col) in enumerate(PLAYABLE_SQUARES):
+        piece = board.board[row][col]
+        if isinstance(piece, Piece):
+            position[index] = piece_code(piece)
+    return position
+
+
+def encode_boost(boost_available):
+    return (boost_available["RED"], boost_available["WHITE"])
+
+
+# (positions, boost) arrays for a list of boards
+def encode_boards(boards):
+    _require_numpy()
+    positions = np.stack([encode(board) for board in boards]) if boards else \
+        np.zeros((0, len(PLAYABLE_SQUARES)), dtype=np.int8)
+    boost = np.array([encode_boost(board.boost_available) for board in boards], dtype=bool).reshape(-1, 2)
+    return positions, boost
+
+
+# Encoding of the position after move (a tuple of (start, end, skip, boost) steps) is
+# played on the board encoded as position; only the squares the move touches change
+def apply_encoded(position, boost, move):
+    position = position.copy()
+    boost = list(boost)
+    for (start_r, start_c), (end_r, end_c), skip, used_boost in move:
+        start, end = SQUARE_INDEX[(start_r, start_c)], SQUARE_INDEX[(end_r, end_c)]
+        code = position[start]
+        position[start] = 0
+        if PROMOTION_ROW[end_r] and abs(code) == MAN:
+            code *= KING
+        position[end] = code
+        for square in skip:
+            position[SQUARE_INDEX[square]] = 0
+        if used_boost:
+            boost[1 if code > 0 else 0] = False
+    return position, tuple(boost)
+
+
+class BatchEvaluator:
+    # Board.evaluate over a stack of encoded positions. Every term of the evaluation is
+    # a per-square value of the code on that square, so the whole stack is scored by one
+    # table gather and a row sum, plus the boost bonus.
+    def __init__(self, weights=None):
+        _require_numpy()
+        self.weights = dict(EVAL_WEIGHTS, **(weights or {}))
+        king, hole = self.weights["king"], self.weights["hole"]
+        holes = np.array([HOLE_ADJACENCY[row][col] for row, col in PLAYABLE_SQUARES], dtype=np.float64)
+        # table[code + KING, square]
+        self.table = np.zeros((2 * KING + 1, len(PLAYABLE_SQUARES)))
+        for code in (-KING, -MAN, MAN, KING):
+            sign = 1 if code > 0 else -1
+            self.table[code + KING] = sign * (1 + (king if abs(code) == KING else 0) - hole * holes)
+        self.squares = np.arange(len(PLAYABLE_SQUARES))
+
+    # Scores from WHITE's point of view for positions (N x 50 int8) and boost (N x 2 bool)
+    def evaluate(self, positions, boost=None):
+        positions = np.asarray(positions, dtype=np.int8)
+        scores = self.table[positions.astype(np.intp) + KING, self.squares].sum(axis=1)
+        if boost is not None:
+            boost = np.asarray(boost, dtype=bool)
+            scores += self.weights["boost"] * (boost[:, 1].astype(np.float64) - boost[:, 0])
+        return scores
+
+    def evaluate_boards(self, boards):
+        return self.evaluate(*encode_boards(boards))
@@ -0,0 +1,295 @@
+from .constants import RED, WHITE, EVAL_WEIGHTS
+from .geometry import DEFAULT_GEOMETRY, UP, DOWN
+
+# Bitboards of the standard board. Bits are the 50 dark squares numbered in board order,
+# five per row, so a mask is a small int and scanning it from the low bit visits pieces
+# in the order Board does. Holes are dark squares too and have their own mask.
+GEOMETRY = DEFAULT_GEOMETRY
+SQUARES = [(row, col) for row in range(GEOMETRY.rows) for col in range(GEOMETRY.cols)
+           if GEOMETRY.is_dark(row, col)]
+INDEX = {sq: i for i, sq in enumerate(SQUARES)}
+ALL_DIRECTIONS = UP + DOWN
+
+
+def square(row, col):
+    return INDEX[(row, col)]
+
+
+def bit(row, col):
+    return 1 << INDEX[(row, col)]
+
+
+popcount = int.bit_count
+
+
+def _mask(squares):
+    mask = 0
+    for sq in squares:
+        mask |= 1 << INDEX[sq]
+    return mask
+
+
+ALL_MASK = (1 << len(SQUARES)) - 1
+HOLE_MASK = _mask(GEOMETRY.holes)
+OPEN_MASK = ALL_MASK & ~HOLE_MASK
+PROMOTION_MASK = _mask(sq for sq in SQUARES if GEOMETRY.promotion_row[sq[0]])
+
+
+# Geometry table entries per direction and square index, with squares as indices
+def _index_table(table, value=lambda target: INDEX.get(target)):
+    return [[value(table[row][col][d]) for row, col in SQUARES] for d in range(4)]
+
+
+STEP_TO = _index_table(GEOMETRY.step)
+# (jumped square, landing square) of a first jump and of a jump continuing a chain
+JUMPS = _index_table(GEOMETRY.jump, lambda jump: jump and (INDEX[jump[0]], INDEX[jump[1]]))
+CHAIN_JUMPS = _index_table(GEOMETRY.chain_jump, lambda jump: jump and (INDEX[jump[0]], INDEX[jump[1]]))
+CHAIN_BLOCKED = _index_table(GEOMETRY.chain_blocked, bool)
+BOOST_TO = _index_table(GEOMETRY.boost_landing)
+
+
+# (sources, delta) pairs for a per-square target table: the squares whose target is
+# delta indices away. With five squares a row a diagonal step is 4 or 5 (5 or 6) squares
+# depending on the row, so a direction takes one shift per row parity.
+def _shift_groups(targets):
+    groups = {}
+    for i, target in enumerate(targets):
+        if target is not None:
+            groups[target - i] = groups.get(target - i, 0) | 1 << i
+    return tuple((mask, delta) for delta, mask in groups.items())
+
+
+STEP_SHIFTS = [_shift_groups(targets) for targets in STEP_TO]
+JUMP_SHIFTS = [_shift_groups([jump and jump[1] for jump in jumps]) for jumps in JUMPS]
+BOOST_SHIFTS = [_shift_groups(targets) for targets in BOOST_TO]
+
+
+# The movers whose target under shifts is in targets, found with one shift and AND per group
+def _sources(movers, shifts, targets):
+    found = 0
+    for mask, delta in shifts:
+        if delta > 0:
+            found |= ((movers & mask) << delta & targets) >> delta
+        else:
+            found |= ((movers & mask) >> -delta & targets) << -delta
+    return found
+
+
+# evaluate() counts a piece once per hole orthogonally next to it, so the adjacency is
+# stored as layers: a square next to two holes is in two layers.
+HOLE_ADJACENCY_LAYERS = [
+    _mask(sq for sq in SQUARES if GEOMETRY.hole_adjacency[sq[0]][sq[1]] >= level)
+    for level in range(1, max(GEOMETRY.hole_adjacency[row][col] for row, col in SQUARES) + 1)
+]
+
+# PIECE_KEYS[color][king][square]: the Zobrist keys of the standard board
+PIECE_KEYS = {
+    color: [[GEOMETRY.piece_keys[row][col][(color, king)] for row, col in SQUARES] for king in (False, True)]
+    for color in (RED, WHITE)
+}
+
+
+class BitBoard:
+    # Search position of the standard board as red, white and king masks. It plays the
+    # same (start, end, skip, boost) steps as Board, generates the same moves in the same
+    # order and has the same Zobrist keys and evaluation, so minimax runs on either.
+    __slots__ = ("red", "white", "kings", "boost_available", "hash")
+    geometry = GEOMETRY
+
+    def __init__(self, red=0, white=0, kings=0, boost_available=None):
+        self.red = red
+        self.white = white
+        self.kings = kings
+        self.boost_available = dict(boost_available or {"RED": True, "WHITE": True})
+        key = 0
+        for color, mask in ((RED, red), (WHITE, white)):
+            while mask:
+                low = mask & -mask
+                key ^= PIECE_KEYS[color][bool(kings & low)][low.bit_length() - 1]
+                mask ^= low
+        for side, available in self.boost_available.items():
+            if available:
+                key ^= GEOMETRY.boost_keys[side]
+        self.hash = key
+
+    @classmethod
+    def from_board(cls, board):
+        if board.geometry is not GEOMETRY:
+            raise ValueError("bitboards only cover the standard board")
+        red = white = kings = 0
+        for color, pieces in board.pieces.items():
+            for piece in pieces:
+                b = 1 << INDEX[(piece.row, piece.col)]
+                if color == RED:
+                    red |= b
+                else:
+                    white |= b
+                if piece.king:
+                    kings |= b
+        return cls(red, white, kings, board.boost_available)
+
+    def copy(self):
+        return BitBoard(self.red, self.white, self.kings, self.boost_available)
+
+    def __eq__(self, other):
+        return ((self.red, self.white, self.kings, self.boost_available)
+                == (other.red, other.white, other.kings, other.boost_available))
+
+    def to_rows(self):
+        rows = [["#" if (row, col) in GEOMETRY.hole_set else "." for col in range(GEOMETRY.cols)]
+                for row in range(GEOMETRY.rows)]
+        for i, (row, col) in enumerate(SQUARES):
+            b = 1 << i
+            if (self.red | self.white) & b:
+                char = "r" if self.red & b else "w"
+                rows[row][col] = char.upper() if self.kings & b else char
+        return ["".join(row) for row in rows]
+
+    @property
+    def red_left(self):
+        return popcount(self.red)
+
+    @property
+    def white_left(self):
+        return popcount(self.white)
+
+    def is_king(self, row, col):
+        return bool(self.kings >> INDEX[(row, col)] & 1)
+
+    def zobrist_key(self, color):
+        return self.hash ^ GEOMETRY.side_key if color == WHITE else self.hash
+
+    def evaluate(self, boost_available=None, weights=None):
+        if boost_available is None:
+            boost_available = self.boost_available
+        if weights is None:
+            weights = EVAL_WEIGHTS
+        red, white, kings = self.red, self.white, self.kings
+        score = popcount(white) - popcount(red)
+        score += weights["king"] * (popcount(white & kings) - popcount(red & kings))
+        hole_balance = 0
+        for layer in HOLE_ADJACENCY_LAYERS:
+            hole_balance += popcount(white & layer) - popcount(red & layer)
+        score -= weights["hole"] * hole_balance
+
+        if boost_available:
+            if boost_available["WHITE"]:
+                score += weights["boost"]
+            if boost_available["RED"]:
+                score -= weights["boost"]
+        return score
+
+    def winner(self):
+        if not self.red:
+            return WHITE
+        elif not self.white:
+            return RED
+        return None
+
+    # Board.get_side_moves on the masks. Which pieces can step, jump or boost in each
+    # direction is found with shifts and ANDs over the whole side; only jump chains are
+    # followed square by square.
+    def get_side_moves(self, color, allow_boost=False):
+        own, enemy = (self.red, self.white) if color == RED else (self.white, self.red)
+        occupied = own | enemy
+        empty = OPEN_MASK & ~occupied
+        # a jump may land on a hole and carry on from there
+        free = ALL_MASK & ~occupied
+        kings = own & self.kings
+        forward = UP if color == RED else DOWN
+        steps, jumps, boosts = [0] * 4, [0] * 4, [0] * 4
+        for d in ALL_DIRECTIONS:
+            movers = own if d in forward else kings
+            if not movers:
+                continue
+            steps[d] = _sources(movers, STEP_SHIFTS[d], empty)
+            attackers = _sources(movers, STEP_SHIFTS[d], enemy)
+            if attackers:
+                jumps[d] = _sources(attackers, JUMP_SHIFTS[d], free)
+            if allow_boost:
+                # a boost over an enemy would land where its capture does
+                boosts[d] = _sources(movers & ~attackers, BOOST_SHIFTS[d], empty)
+        any_jump = jumps[0] | jumps[1] | jumps[2] | jumps[3]
+        active = steps[0] | steps[1] | steps[2] | steps[3] | any_jump | boosts[0] | boosts[1] | boosts[2] | boosts[3]
+
+        moves = []
+        while active:
+            low = active & -active
+            active ^= low
+            i = low.bit_length() - 1
+            start = SQUARES[i]
+            directions = ALL_DIRECTIONS if kings & low else forward
+            if any_jump & low:
+                targets = {}
+                for d in directions:
+                    if steps[d] & low:
+                        targets[STEP_TO[d][i]] = ()
+                    elif jumps[d] & low:
+                        self._jump(i, d, (), enemy, free, targets)
+                for end, captured in targets.items():
+                    if not HOLE_MASK >> end & 1:
+                        moves.append((((start, SQUARES[end], captured, False),), False))
+            else:
+                for d in directions:
+                    if steps[d] & low:
+                        moves.append((((start, SQUARES[STEP_TO[d][i]], (), False),), False))
+            if allow_boost:
+                for d in directions:
+                    if boosts[d] & low:
+                        moves.append((((start, SQUARES[BOOST_TO[d][i]], (), True),), True))
+        return moves
+
+    # Board._traverse from the jump off square i in direction d: records the landing with
+    # the captured squares and follows the chain to either side in the same vertical direction
+    def _jump(self, i, d, skipped, enemy, free, targets):
+        jump = (CHAIN_JUMPS if skipped else JUMPS)[d][i]
+        if jump is None:
+            return
+        over, land = jump
+        if not enemy >> over & 1 or not free >> land & 1:
+            return
+        captured = (SQUARES[over],) + skipped
+        targets[land] = captured
+        if CHAIN_BLOCKED[d][land]:
+            return
+        for next_d in (UP if d in UP else DOWN):
+            self._jump(land, next_d, captured[:1], enemy, free, targets)
+
+    # Apply a single (start, end, skip, boost) step and return what unmake_move needs
+    def make_move(self, move):
+        start, end, skip, boost = move
+        src, dst = INDEX[start], INDEX[end]
+        src_bit, dst_bit = 1 << src, 1 << dst
+        red, white, kings, key = self.red, self.white, self.kings, self.hash
+        token = (red, white, kings, key, None)
+        color, other = (RED, WHITE) if red & src_bit else (WHITE, RED)
+        king = bool(kings & src_bit)
+        king_after = king or bool(dst_bit & PROMOTION_MASK)
+        key ^= PIECE_KEYS[color][king][src] ^ PIECE_KEYS[color][king_after][dst]
+        if color == RED:
+            red ^= src_bit | dst_bit
+        else:
+            white ^= src_bit | dst_bit
+        kings &= ~src_bit
+        if king_after:
+            kings |= dst_bit
+        for sq in skip:
+            i = INDEX[sq]
+            b = 1 << i
+            key ^= PIECE_KEYS[other][bool(kings & b)][i]
+            red &= ~b
+            white &= ~b
+            kings &= ~b
+        if boost:
+            side = "RED" if color == RED else "WHITE"
+            if self.boost_available[side]:
+                self.boost_available[side] = False
+                key ^= GEOMETRY.boost_keys[side]
+                token = token[:4] + (side,)
+        self.red, self.white, self.kings, self.hash = red, white, kings, key
+        return token
+
+    def unmake_move(self, token):
+        self.red, self.white, self.kings, self.hash, used_boost = token
+        if used_boost:
+            self.boost_available[used_boost] = True
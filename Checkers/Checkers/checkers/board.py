@@ -1,199 +1,401 @@
-import pygame
-from .constants import BLACK, ROWS, RED, SQUARE_SIZE, COLS, WHITE, HOLES
-from .piece import Piece
-
-class Board:
-    def __init__(self):
-        self.board = []
-        self.red_left = self.white_left = 12
-        self.red_kings = self.white_kings = 0
-        self.create_board()
-    
-    def draw_squares(self, win):
-        win.fill(BLACK)
-        for row in range(ROWS):
-            for col in range(row % 2, COLS, 2):
-                pygame.draw.rect(win, RED, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-        for row, col in HOLES:
-            pygame.draw.rect(win, (100, 100, 100), (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
- # evaluate function to calculate the score of the board state
-    def evaluate(self, boost_available=None):
-        score = self.white_left - self.red_left
-        score += 0.5 * (self.white_kings - self.red_kings)
-
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
-                if isinstance(piece, Piece):
-                    for hole_r, hole_c in HOLES:
-                        dist = abs(row - hole_r) + abs(col - hole_c)
-                        if dist == 1:
-                            if piece.color == WHITE:
-                                score -= 0.1
-                            else:
-                                score += 0.1
-
-        if boost_available:
-            if boost_available["WHITE"]:
-                score += 0.2
-            if boost_available["RED"]:
-                score -= 0.2
-
-        return score
-
-    def get_all_pieces(self, color):
-        return [piece for row in self.board for piece in row if piece != 0 and piece is not None and piece.color == color]
-
-    def move(self, piece, row, col):
-        self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
-        piece.move(row, col)
-        if row == 0 or row == ROWS - 1:
-            piece.make_king()
-            if piece.color == WHITE:
-                self.white_kings += 1
-            else:
-                self.red_kings += 1
-
-    def get_piece(self, row, col):
-        if (row, col) in HOLES:
-            return None
-        return self.board[row][col]
-
-    def create_board(self):
-        for row in range(ROWS):
-            self.board.append([])
-            for col in range(COLS):
-                if (row, col) in HOLES:
-                    self.board[row].append(None)
-                elif col % 2 == ((row + 1) % 2):
-                    if row < 3:
-                        self.board[row].append(Piece(row, col, WHITE))
-                    elif row > 6:
-                        self.board[row].append(Piece(row, col, RED))
-                    else:
-                        self.board[row].append(0)
-                else:
-                    self.board[row].append(0)
-
-    def draw(self, win):
-        self.draw_squares(win)
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
-                if piece != 0 and piece is not None:
-                    piece.draw(win)
-
-    def remove(self, pieces):
-        for piece in pieces:
-            self.board[piece.row][piece.col] = 0
-            if piece != 0:
-                if piece.color == RED:
-                    self.red_left -= 1
-                else:
-                    self.white_left -= 1
-
-    def winner(self):
-        if self.red_left <= 0:
-            return WHITE
-        elif self.white_left <= 0:
-            return RED
-        return None
-
-    def get_valid_boost_moves(self, piece):
-        moves = {}
-        if piece is None:
-            return moves
-        directions = []
-        if piece.color == RED or piece.king:
-            directions += [(-2, -2), (-2, 2)]
-        if piece.color == WHITE or piece.king:
-            directions += [(2, -2), (2, 2)]
-        for dr, dc in directions:
-            r, c = piece.row + dr, piece.col + dc
-            if 0 <= r < ROWS and 0 <= c < COLS and (r, c) not in HOLES and self.board[r][c] == 0:
-                moves[(r, c)] = []
-        return moves
-
-    def get_valid_moves(self, piece, allow_boost=False, boost_used=False):
-        moves = {}
-        if piece is None:
-            return moves
-        left = piece.col - 1
-        right = piece.col + 1
-        row = piece.row
-# see if the destination is valid
-        def is_valid_dest(r, c):
-            return 0 <= r < ROWS and 0 <= c < COLS and (r, c) not in HOLES and self.board[r][c] == 0
-
-        if piece.color == RED or piece.king:
-            moves.update(self._traverse_left(row - 1, max(row - 3, -1), -1, piece.color, left))
-            moves.update(self._traverse_right(row - 1, max(row - 3, -1), -1, piece.color, right))
-        if piece.color == WHITE or piece.king:
-            moves.update(self._traverse_left(row + 1, min(row + 3, ROWS), 1, piece.color, left))
-            moves.update(self._traverse_right(row + 1, min(row + 3, ROWS), 1, piece.color, right))
-
-        moves = {move: skipped for move, skipped in moves.items() if is_valid_dest(*move)}
-
-        if allow_boost and not boost_used:
-            moves.update(self.get_valid_boost_moves(piece))
-        return moves
-    # Helper methods to traverse the board for valid moves
-    def _traverse_left(self, start, stop, step, color, left, skipped=[]):
-        moves = {}
-        last = []
-        for r in range(start, stop, step):
-            if left < 0:
-                break
-            current = self.board[r][left]
-            if current == 0 or current is None:
-                if skipped and not last:
-                    break
-                elif skipped:
-                    moves[(r, left)] = last + skipped
-                else:
-                    moves[(r, left)] = last
-                if last:
-                    prev_r = r - step
-                    prev_c = left + 1 if step == -1 else left - 1
-                    if 0 <= prev_r < ROWS and 0 <= prev_c < COLS and self.board[prev_r][prev_c] is None:
-                        break
-                    next_row = max(r - 3, 0) if step == -1 else min(r + 3, ROWS)
-                    moves.update(self._traverse_left(r + step, next_row, step, color, left - 1, skipped=last))
-                    moves.update(self._traverse_right(r + step, next_row, step, color, left + 1, skipped=last))
-                break
-            elif isinstance(current, Piece) and current.color == color:
-                break
-            else:
-                last = [current]
-            left -= 1
-        return moves
-# Helper method to traverse the board for valid moves in the right direction
-    def _traverse_right(self, start, stop, step, color, right, skipped=[]):
-        moves = {}
-        last = []
-        for r in range(start, stop, step):
-            if right >= COLS:
-                break
-            current = self.board[r][right]
-            if current == 0 or current is None:
-                if skipped and not last:
-                    break
-                elif skipped:
-                    moves[(r, right)] = last + skipped
-                else:
-                    moves[(r, right)] = last
-                if last:
-                    prev_r = r - step
-                    prev_c = right - 1 if step == -1 else right + 1
-                    if 0 <= prev_r < ROWS and 0 <= prev_c < COLS and self.board[prev_r][prev_c] is None:
-                        break
-                    next_row = max(r - 3, 0) if step == -1 else min(r + 3, ROWS)
-                    moves.update(self._traverse_left(r + step, next_row, step, color, right - 1, skipped=last))
-                    moves.update(self._traverse_right(r + step, next_row, step, color, right + 1, skipped=last))
-                break
-            elif isinstance(current, Piece) and current.color == color:
-                break
-            else:
-                last = [current]
-            right += 1
-        return moves
+import os
+from .constants import BLACK, RED, SQUARE_SIZE, WHITE, EVAL_WEIGHTS
+from .piece import Piece
+from .geometry import DEFAULT_GEOMETRY, UP, DOWN
+
+# Hole adjacency of the standard board
+HOLE_ADJACENCY = DEFAULT_GEOMETRY.hole_adjacency
+
+
+def _board_order(piece):
+    return piece.row, piece.col
+
+
+class Board:
+    # When set, evaluate() checks the running totals against a full rescan of the board
+    debug_eval = os.environ.get("CHECKERS_DEBUG_EVAL") == "1"
+
+    # geometry (a geometry.Geometry) is the layout: size, holes and starting rows
+    def __init__(self, geometry=DEFAULT_GEOMETRY):
+        self.geometry = geometry
+        self.board = []
+        self.red_left = self.white_left = 0
+        self.red_kings = self.white_kings = 0
+        # sum of the hole adjacency over WHITE pieces minus the same over RED pieces
+        self.hole_balance = 0
+        self.boost_available = {"RED": True, "WHITE": True}
+        self.hash = geometry.boost_keys["RED"] ^ geometry.boost_keys["WHITE"]
+        # the pieces on the board per color, kept up to date by remove() and unmake_move()
+        self.pieces = {RED: [], WHITE: []}
+        self.create_board()
+    
+    # Everything on a Board besides the grid, the piece lists and the boost flags is an
+    # immutable value (or the shared geometry), so a copy only has to rebuild those
+    def __deepcopy__(self, memo):
+        board = type(self).__new__(type(self))
+        board.__dict__.update(self.__dict__)
+        board.board = [[piece.copy() if piece else piece for piece in row] for row in self.board]
+        board.pieces = {RED: [], WHITE: []}
+        for row in board.board:
+            for piece in row:
+                if piece:
+                    board.pieces[piece.color].append(piece)
+        board.boost_available = dict(self.boost_available)
+        memo[id(self)] = board
+        return board
+
+    def draw_squares(self, win):
+        import pygame
+        win.fill(BLACK)
+        for row in range(self.geometry.rows):
+            for col in range(row % 2, self.geometry.cols, 2):
+                pygame.draw.rect(win, RED, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        for row, col in self.geometry.holes:
+            pygame.draw.rect(win, (100, 100, 100), (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+ # evaluate function to calculate the score of the board state, from the running
+ # material, king and hole-adjacency totals that move(), remove() and promotion keep
+    def evaluate(self, boost_available=None, weights=None):
+        if boost_available is None:
+            boost_available = self.boost_available
+        if weights is None:
+            weights = EVAL_WEIGHTS
+        score = self.white_left - self.red_left
+        score += weights["king"] * (self.white_kings - self.red_kings)
+        score -= weights["hole"] * self.hole_balance
+
+        if boost_available:
+            if boost_available["WHITE"]:
+                score += weights["boost"]
+            if boost_available["RED"]:
+                score -= weights["boost"]
+
+        if self.debug_eval:
+            expected = self.full_evaluate(boost_available, weights)
+            assert abs(score - expected) < 1e-9, f"incremental eval {score} != full eval {expected}"
+        return score
+
+    # Reference evaluation that rescans every square
+    def full_evaluate(self, boost_available=None, weights=None):
+        if boost_available is None:
+            boost_available = self.boost_available
+        if weights is None:
+            weights = EVAL_WEIGHTS
+        white = self.get_all_pieces(WHITE)
+        red = self.get_all_pieces(RED)
+        score = len(white) - len(red)
+        score += weights["king"] * (sum(p.king for p in white) - sum(p.king for p in red))
+
+        for row in range(self.geometry.rows):
+            for col in range(self.geometry.cols):
+                piece = self.board[row][col]
+                if isinstance(piece, Piece):
+                    for hole_r, hole_c in self.geometry.holes:
+                        dist = abs(row - hole_r) + abs(col - hole_c)
+                        if dist == 1:
+                            if piece.color == WHITE:
+                                score -= weights["hole"]
+                            else:
+                                score += weights["hole"]
+
+        if boost_available:
+            if boost_available["WHITE"]:
+                score += weights["boost"]
+            if boost_available["RED"]:
+                score -= weights["boost"]
+
+        return score
+
+    # Pieces of color in board order (row by row), from the maintained piece list
+    def get_all_pieces(self, color):
+        return sorted(self.pieces[color], key=_board_order)
+
+    def is_king(self, row, col):
+        piece = self.board[row][col]
+        return bool(piece) and piece.king
+
+    def piece_key(self, piece):
+        return self.geometry.piece_keys[piece.row][piece.col][(piece.color, piece.king)]
+
+    def move(self, piece, row, col):
+        geometry = self.geometry
+        self.hash ^= self.piece_key(piece)
+        sign = 1 if piece.color == WHITE else -1
+        self.hole_balance += sign * (geometry.hole_adjacency[row][col] - geometry.hole_adjacency[piece.row][piece.col])
+        self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
+        piece.move(row, col)
+        if geometry.promotion_row[row] and not piece.king:
+            piece.make_king()
+            if piece.color == WHITE:
+                self.white_kings += 1
+            else:
+                self.red_kings += 1
+        self.hash ^= self.piece_key(piece)
+
+    # Position key for search; the side to move is folded in on top of the board hash
+    def zobrist_key(self, color):
+        return self.hash ^ self.geometry.side_key if color == WHITE else self.hash
+
+    def use_boost(self, side):
+        if self.boost_available[side]:
+            self.boost_available[side] = False
+            self.hash ^= self.geometry.boost_keys[side]
+
+    # Apply a single (start, end, skip, boost) step in place and return what unmake_move needs.
+    # skip holds the (row, col) squares of captured pieces so moves never reference Piece objects.
+    def make_move(self, move):
+        start, end, skip, boost = move
+        piece = self.board[start[0]][start[1]]
+        side = "RED" if piece.color == RED else "WHITE"
+        captured = [self.board[row][col] for row, col in skip]
+        token = (piece, start, end, captured, boost and self.boost_available[side], piece.king,
+                 self.red_left, self.white_left, self.red_kings, self.white_kings, self.hash, self.hole_balance)
+        self.move(piece, end[0], end[1])
+        if captured:
+            self.remove(captured)
+        if boost:
+            self.use_boost(side)
+        return token
+
+    def unmake_move(self, token):
+        (piece, start, end, captured, used_boost, was_king,
+         red_left, white_left, red_kings, white_kings, key, hole_balance) = token
+        self.board[end[0]][end[1]] = 0
+        self.board[start[0]][start[1]] = piece
+        piece.move(start[0], start[1])
+        piece.king = was_king
+        for captured_piece in captured:
+            self.board[captured_piece.row][captured_piece.col] = captured_piece
+            self.pieces[captured_piece.color].append(captured_piece)
+        self.red_left, self.white_left = red_left, white_left
+        self.red_kings, self.white_kings = red_kings, white_kings
+        if used_boost:
+            self.boost_available["RED" if piece.color == RED else "WHITE"] = True
+        self.hash = key
+        self.hole_balance = hole_balance
+
+    def get_piece(self, row, col):
+        if (row, col) in self.geometry.hole_set:
+            return None
+        return self.board[row][col]
+
+    # Men fill the dark squares of the first start_rows rows (WHITE, at the top) and of
+    # the last start_rows rows (RED)
+    def create_board(self):
+        geometry = self.geometry
+        for row in range(geometry.rows):
+            self.board.append([])
+            for col in range(geometry.cols):
+                if (row, col) in geometry.hole_set:
+                    self.board[row].append(None)
+                elif geometry.is_dark(row, col):
+                    if row < geometry.start_rows:
+                        color = WHITE
+                    elif row >= geometry.rows - geometry.start_rows:
+                        color = RED
+                    else:
+                        self.board[row].append(0)
+                        continue
+                    self.board[row].append(0)
+                    self._place(Piece(row, col, color))
+                else:
+                    self.board[row].append(0)
+
+    # Put piece on its (empty) square and count it in the running totals
+    def _place(self, piece):
+        self.board[piece.row][piece.col] = piece
+        self.pieces[piece.color].append(piece)
+        self.hash ^= self.piece_key(piece)
+        self.hole_balance += (1 if piece.color == WHITE else -1) * self.geometry.hole_adjacency[piece.row][piece.col]
+        if piece.color == RED:
+            self.red_left += 1
+            self.red_kings += piece.king
+        else:
+            self.white_left += 1
+            self.white_kings += piece.king
+
+    # Build a position from one string per row with one character per column: r/w for
+    # men, R/W for kings, anything else for an empty square. Holes always come from the
+    # geometry.
+    @classmethod
+    def from_rows(cls, rows, boost_available=None, geometry=DEFAULT_GEOMETRY):
+        board = cls(geometry)
+        board.red_left = board.white_left = board.red_kings = board.white_kings = 0
+        board.hole_balance = 0
+        board.pieces = {RED: [], WHITE: []}
+        board.boost_available = dict(boost_available or {"RED": True, "WHITE": True})
+        board.hash = 0
+        for side, available in board.boost_available.items():
+            if available:
+                board.hash ^= geometry.boost_keys[side]
+        for row in range(geometry.rows):
+            for col in range(geometry.cols):
+                if (row, col) in geometry.hole_set:
+                    board.board[row][col] = None
+                    continue
+                board.board[row][col] = 0
+                char = rows[row][col]
+                if char not in "rRwW":
+                    continue
+                piece = Piece(row, col, RED if char in "rR" else WHITE)
+                if char.isupper():
+                    piece.make_king()
+                board._place(piece)
+        return board
+
+    def to_rows(self):
+        rows = []
+        for row in range(self.geometry.rows):
+            chars = []
+            for col in range(self.geometry.cols):
+                piece = self.board[row][col]
+                if piece is None:
+                    chars.append("#")
+                elif piece == 0:
+                    chars.append(".")
+                else:
+                    char = "r" if piece.color == RED else "w"
+                    chars.append(char.upper() if piece.king else char)
+            rows.append("".join(chars))
+        return rows
+
+    def draw(self, win):
+        self.draw_squares(win)
+        for row in range(self.geometry.rows):
+            for col in range(self.geometry.cols):
+                piece = self.board[row][col]
+                if piece != 0 and piece is not None:
+                    piece.draw(win)
+
+    def remove(self, pieces):
+        for piece in pieces:
+            self.board[piece.row][piece.col] = 0
+            if piece != 0:
+                self.pieces[piece.color].remove(piece)
+                self.hash ^= self.piece_key(piece)
+                if piece.color == RED:
+                    self.red_left -= 1
+                    self.red_kings -= piece.king
+                    self.hole_balance += self.geometry.hole_adjacency[piece.row][piece.col]
+                else:
+                    self.white_left -= 1
+                    self.white_kings -= piece.king
+                    self.hole_balance -= self.geometry.hole_adjacency[piece.row][piece.col]
+
+    def winner(self):
+        if self.red_left <= 0:
+            return WHITE
+        elif self.white_left <= 0:
+            return RED
+        return None
+
+    def get_valid_boost_moves(self, piece):
+        moves = {}
+        if piece is None:
+            return moves
+        for d in self._directions(piece):
+            target = self.geometry.boost_landing[piece.row][piece.col][d]
+            if target is not None and self.board[target[0]][target[1]] == 0:
+                moves[target] = []
+        return moves
+
+    def _directions(self, piece):
+        if piece.king:
+            return UP + DOWN
+        return UP if piece.color == RED else DOWN
+
+    # Every (move, used_boost) of color in the format and order of
+    # minimax.algorithm.get_all_moves: per piece its steps and captures, then (with
+    # allow_boost) its boost landings not reachable without the boost. Each piece's
+    # diagonals are walked once and boost landings read straight from the table.
+    def get_side_moves(self, color, allow_boost=False):
+        moves = []
+        board = self.board
+        boost_landing = self.geometry.boost_landing
+        for piece in self.get_all_pieces(color):
+            row, col = piece.row, piece.col
+            start = (row, col)
+            directions = self._directions(piece)
+            targets = {}
+            for d in directions:
+                self._traverse(row, col, d, color, [], targets)
+            valid = set()
+            for end, skipped in targets.items():
+                if board[end[0]][end[1]] == 0:
+                    valid.add(end)
+                    moves.append((((start, end, tuple((p.row, p.col) for p in skipped), False),), False))
+            if allow_boost:
+                for d in directions:
+                    target = boost_landing[row][col][d]
+                    if target is not None and target not in valid and board[target[0]][target[1]] == 0:
+                        valid.add(target)
+                        moves.append((((start, target, (), True),), True))
+        return moves
+
+    # Whether color has any move at all, stopping at the first one found
+    def has_any_legal_move(self, color, allow_boost=False):
+        board = self.board
+        geometry = self.geometry
+        for piece in self.pieces[color]:
+            row, col = piece.row, piece.col
+            for d in self._directions(piece):
+                target = geometry.step[row][col][d]
+                if target is not None:
+                    current = board[target[0]][target[1]]
+                    if current == 0:
+                        return True
+                    if current is not None and current.color != color:
+                        jump = geometry.jump[row][col][d]
+                        if jump is not None:
+                            landing = board[jump[1][0]][jump[1][1]]
+                            if landing == 0:
+                                return True
+                            # a chain may carry on past a jump that lands on a hole
+                            if landing is None:
+                                targets = {}
+                                self._traverse(row, col, d, color, [], targets)
+                                if any(board[r][c] == 0 for r, c in targets):
+                                    return True
+                if allow_boost:
+                    landing = geometry.boost_landing[row][col][d]
+                    if landing is not None and board[landing[0]][landing[1]] == 0:
+                        return True
+        return False
+
+    def get_valid_moves(self, piece, allow_boost=False, boost_used=False):
+        moves = {}
+        if piece is None:
+            return moves
+        for d in self._directions(piece):
+            self._traverse(piece.row, piece.col, d, piece.color, [], moves)
+        # holes are None, so only empty squares compare equal to 0
+        moves = {move: skipped for move, skipped in moves.items() if self.board[move[0]][move[1]] == 0}
+
+        if allow_boost and not boost_used:
+            moves.update(self.get_valid_boost_moves(piece))
+        return moves
+    # Helper method to walk one diagonal from (row, col): a step onto an empty square,
+    # or a jump that may continue the chain to either side in the same vertical direction
+    def _traverse(self, row, col, d, color, skipped, moves):
+        geometry = self.geometry
+        target = geometry.step[row][col][d]
+        if target is None:
+            return
+        current = self.board[target[0]][target[1]]
+        if current == 0 or current is None:
+            if not skipped:
+                moves[target] = []
+            return
+        if current.color == color:
+            return
+        jump = geometry.chain_jump[row][col][d] if skipped else geometry.jump[row][col][d]
+        if jump is None:
+            return
+        land_r, land_c = jump[1]
+        landing = self.board[land_r][land_c]
+        if landing != 0 and landing is not None:
+            return
+        moves[(land_r, land_c)] = [current] + skipped
+        if geometry.chain_blocked[land_r][land_c][d]:
+            return
+        for next_d in (UP if d in UP else DOWN):
+            self._traverse(land_r, land_c, next_d, color, [current], moves)
@@ -0,0 +1,2 @@
+from .state import GameState
+from .search import search
@@ -0,0 +1,36 @@
+import threading
+from copy import deepcopy
+
+from .search import search
+
+
+class BackgroundSearch:
+    # search() on a private copy of a GameState in a daemon thread, so a UI loop can keep
+    # running. Keyword arguments go to search(). cancel() stops it at the next node.
+    def __init__(self, state, **kwargs):
+        self.state = deepcopy(state)
+        self.stop = threading.Event()
+        self.error = None
+        self._result = None
+        self.thread = threading.Thread(target=self._run, kwargs=kwargs, daemon=True)
+        self.thread.start()
+
+    def _run(self, **kwargs):
+        try:
+            self._result = search(self.state, stop=self.stop, **kwargs)
+        except Exception as error:
+            self.error = error
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    # (score, move, depth) once done; waits up to timeout seconds (None: until finished)
+    def result(self, timeout=None):
+        self.thread.join(timeout)
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+    def cancel(self):
+        self.stop.set()
+        self.thread.join()
@@ -0,0 +1,113 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ..board import Board
+from ..constants import COLS
+from ..geometry import DEFAULT_GEOMETRY
+from .hashfile import SortedHashFile, write_sorted
+from .search import search
+from .state import GameState
+
+BOOK_MAGIC = b"CKBK"
+# start square, end square, boost flag, search depth, score (WHITE's point of view)
+BOOK_PAYLOAD = "BBBBf"
+DEFAULT_BOOK_PATH = "book.bin"
+
+
+class OpeningBook:
+    # Best moves for opening positions keyed by Zobrist key (side to move included).
+    # The file is mmapped, so opening it costs nothing and workers share its pages.
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.table = SortedHashFile(path, BOOK_MAGIC, BOOK_PAYLOAD)
+
+    # Book entry for the side to move as (score, move, depth), or None. The stored
+    # squares are matched against the piece's legal moves, so a key collision can
+    # never return an illegal move. Books are built for the standard board only.
+    def probe(self, state):
+        if state.board.geometry is not DEFAULT_GEOMETRY:
+            return None
+        entry = self.table.get(state.board.zobrist_key(state.turn))
+        if entry is None:
+            return None
+        start, end, boost, depth, score = entry
+        piece = state.board.get_piece(*divmod(start, COLS))
+        if not piece or piece.color != state.turn:
+            return None
+        step = state.valid_moves(piece, use_boost=bool(boost)).get(divmod(end, COLS))
+        if step is None or step[3] != bool(boost):
+            return None
+        return score, (step,), depth
+
+    def __len__(self):
+        return len(self.table)
+
+    def close(self):
+        self.table.close()
+
+
+# The book if path exists, otherwise None
+def open_book(path=DEFAULT_BOOK_PATH):
+    return OpeningBook(path) if os.path.exists(path) else None
+
+
+# Every distinct position (by key) with a move to make in the first plies of a game
+def book_positions(plies):
+    positions = {}
+
+    def walk(state, depth):
+        if depth == plies or state.winner() is not None:
+            return
+        key = state.board.zobrist_key(state.turn)
+        if key in positions:
+            return
+        positions[key] = (state.board.to_rows(), state.turn, dict(state.board.boost_available))
+        for step in state.legal_moves():
+            token = state.make_move(step)
+            walk(state, depth + 1)
+            state.unmake_move(token)
+
+    walk(GameState(), 0)
+    return positions
+
+
+def _search_position(key, rows, turn, boost_available, depth):
+    state = GameState(Board.from_rows(rows, boost_available))
+    state.turn = turn
+    score, move, _ = search(state, depth=depth)
+    start, end, _, boost = move[0]
+    return key, (start[0] * COLS + start[1], end[0] * COLS + end[1], int(boost), depth, score)
+
+
+# Search every position of the first plies to depth across worker processes and
+# write the results to out_path
+def build_book(out_path=DEFAULT_BOOK_PATH, plies=4, depth=6, workers=None):
+    positions = book_positions(plies)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(_search_position, key, rows, turn, boost, depth)
+                   for key, (rows, turn, boost) in positions.items()]
+        records = [future.result() for future in futures]
+    write_sorted(out_path, BOOK_MAGIC, BOOK_PAYLOAD, records)
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book from deep searches")
+    parser.add_argument("--out", default=DEFAULT_BOOK_PATH)
+    parser.add_argument("--plies", type=int, default=4, help="book every position of the first plies")
+    parser.add_argument("--depth", type=int, default=6, help="search depth per position")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--show", action="store_true", help="print the entries of an existing book")
+    args = parser.parse_args()
+
+    if args.show:
+        book = OpeningBook(args.out)
+        for key, (start, end, boost, depth, score) in book.table.items():
+            print(f"{key:016x} {divmod(start, COLS)}->{divmod(end, COLS)}"
+                  f"{' boost' if boost else ''} depth {depth} score {score:.2f}")
+        book.close()
+    else:
+        start = time.perf_counter()
+        count = build_book(args.out, args.plies, args.depth, args.workers)
+        print(f"{count} positions written to {args.out} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,95 @@
+import heapq
+import mmap
+import os
+import struct
+
+# Files of fixed-width records sorted by a 64-bit position key, read through mmap so
+# that every process opening the same file shares one copy of it in the page cache.
+# Layout: header (magic, record size, record count, info) followed by the records, where
+# info is one number the writer keeps alongside (the tablebase's piece count, say).
+HEADER = struct.Struct("<4sIII")
+
+
+def _record(payload):
+    return struct.Struct("<Q" + payload)
+
+
+# Write (key, values) pairs sorted by key. Later pairs win on duplicate keys. The file
+# is written next to path and renamed over it, so readers never see a partial file.
+def write_sorted(path, magic, payload, records, info=0):
+    _write(path, magic, _record(payload), sorted(dict(records).items()), info)
+
+
+# Write the union of several sources that are each sorted by key with unique keys, such
+# as the items() of other files, one record at a time. Later sources win on duplicate keys.
+def merge_sorted(path, magic, payload, sources, info=0):
+    tagged = [((key, index, values) for key, values in source) for index, source in enumerate(sources)]
+    _write(path, magic, _record(payload), _last_per_key(heapq.merge(*tagged)), info)
+
+
+def _last_per_key(rows):
+    pending = None
+    for key, _, values in rows:
+        if pending is not None and pending[0] != key:
+            yield pending
+        pending = key, values
+    if pending is not None:
+        yield pending
+
+
+# The record count goes into the header once the rows have run out
+def _write(path, magic, record, rows, info):
+    tmp = path + ".tmp"
+    count = 0
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(magic, record.size, 0, info))
+        for key, values in rows:
+            f.write(record.pack(key, *values))
+            count += 1
+        f.seek(0)
+        f.write(HEADER.pack(magic, record.size, count, info))
+    os.replace(tmp, path)
+
+
+class SortedHashFile:
+    def __init__(self, path, magic, payload):
+        self.record = _record(payload)
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, size, self.count, self.info = HEADER.unpack_from(self.data, 0)
+        if file_magic != magic or size != self.record.size:
+            self.data.close()
+            raise ValueError(f"{path} is not a {magic.decode()} file with {self.record.size}-byte records")
+
+    def __len__(self):
+        return self.count
+
+    def _key(self, index):
+        return struct.unpack_from("<Q", self.data, HEADER.size + index * self.record.size)[0]
+
+    # Values stored under key, or None
+    def get(self, key):
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count and self._key(low) == key:
+            return self.record.unpack_from(self.data, HEADER.size + low * self.record.size)[1:]
+        return None
+
+    def items(self):
+        for index in range(self.count):
+            values = self.record.unpack_from(self.data, HEADER.size + index * self.record.size)
+            yield values[0], values[1:]
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
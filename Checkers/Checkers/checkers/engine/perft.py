@@ -0,0 +1,129 @@
+import argparse
+import time
+
+from ..bitboard import BitBoard
+from ..board import Board
+from ..constants import RED, WHITE
+from .state import GameState, side_name
+
+
+class MoveGenMismatch(Exception):
+    # The Board and BitBoard generators disagree (on the moves or their order); carries
+    # the first position where they did
+    def __init__(self, state, only_board, only_bitboard):
+        self.rows = state.board.to_rows()
+        self.turn = side_name(state.turn)
+        self.boost_available = dict(state.board.boost_available)
+        self.only_board = only_board
+        self.only_bitboard = only_bitboard
+        super().__init__(
+            f"move generators diverge with {self.turn} to move\n" + "\n".join(self.rows) +
+            f"\nboost available: {self.boost_available}" +
+            f"\nonly Board: {self.only_board}\nonly BitBoard: {self.only_bitboard}"
+        )
+
+
+# (step, use_twice) pairs under the game rules; with include_twice a capture can also be
+# played as the side's one twice turn.
+def perft_moves(state, include_twice=False):
+    if state.board.winner() is not None:
+        return []
+    moves = []
+    for step in state.legal_moves():
+        moves.append((step, False))
+        if include_twice and state.can_use_twice(step):
+            moves.append((step, True))
+    return moves
+
+
+def cross_check(state):
+    color = state.turn
+    allow_boost = state.boost_available(color)
+    board_moves = state.board.get_side_moves(color, allow_boost)
+    bitboard_moves = BitBoard.from_board(state.board).get_side_moves(color, allow_boost)
+    if board_moves != bitboard_moves:
+        raise MoveGenMismatch(state, [move for move in board_moves if move not in bitboard_moves],
+                              [move for move in bitboard_moves if move not in board_moves])
+
+
+# Leaf count of the game tree to depth plies; a promotion or twice turn is its own ply
+# with the same side to move again. With check=True every node is also generated by
+# BitBoard and MoveGenMismatch is raised at the first disagreement.
+def perft(state, depth, include_twice=False, check=False):
+    if check and state.board.winner() is None:
+        cross_check(state)
+    if depth == 0:
+        return 1
+    nodes = 0
+    for step, use_twice in perft_moves(state, include_twice):
+        token = state.make_move(step, use_twice)
+        nodes += perft(state, depth - 1, include_twice, check)
+        state.unmake_move(token)
+    return nodes
+
+
+def divide(state, depth, include_twice=False, check=False):
+    if check and state.board.winner() is None:
+        cross_check(state)
+    results = []
+    for step, use_twice in perft_moves(state, include_twice):
+        token = state.make_move(step, use_twice)
+        results.append(((step, use_twice), perft(state, depth - 1, include_twice, check) if depth > 1 else 1))
+        state.unmake_move(token)
+    return results
+
+
+def format_move(step, use_twice=False):
+    (r1, c1), (r2, c2), skip, boost = step
+    text = f"{r1},{c1}-{r2},{c2}"
+    if skip:
+        text += "x" + "x".join(f"{r},{c}" for r, c in skip)
+    if boost:
+        text += " boost"
+    if use_twice:
+        text += " twice"
+    return text
+
+
+def load_state(diagram=None, turn=RED, boost="RED,WHITE"):
+    if diagram is None:
+        board = Board()
+        for side in ("RED", "WHITE"):
+            if side not in boost.split(","):
+                board.use_boost(side)
+    else:
+        with open(diagram) as f:
+            rows = [line.rstrip("\n") for line in f if line.strip()]
+        flags = {side: side in boost.split(",") for side in ("RED", "WHITE")}
+        board = Board.from_rows(rows, flags)
+    state = GameState(board)
+    state.turn = turn
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perft node counts for the game rules")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--divide", action="store_true", help="print the count below each root move")
+    parser.add_argument("--check", action="store_true", help="cross-check Board against BitBoard at every node")
+    parser.add_argument("--twice", action="store_true", help="include optional twice turns after captures")
+    parser.add_argument("--diagram", default=None, help="file with one row per line (r/w/R/W/.)")
+    parser.add_argument("--turn", choices=["RED", "WHITE"], default="RED")
+    parser.add_argument("--boost", default="RED,WHITE", help="sides whose boost is still available")
+    args = parser.parse_args()
+
+    state = load_state(args.diagram, RED if args.turn == "RED" else WHITE, args.boost)
+    start = time.perf_counter()
+    try:
+        if args.divide:
+            total = 0
+            for (step, use_twice), count in divide(state, args.depth, args.twice, args.check):
+                print(f"{format_move(step, use_twice)}: {count}")
+                total += count
+        else:
+            total = perft(state, args.depth, args.twice, args.check)
+    except MoveGenMismatch as mismatch:
+        print(mismatch)
+        raise SystemExit(1)
+    elapsed = time.perf_counter() - start
+    print(f"depth {args.depth}: {total} nodes in {elapsed:.3f}s ({total / elapsed:.0f} nodes/s)")
@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from minimax.transposition import TranspositionTable
+from ..constants import COLS, RED, WHITE
+from ..geometry import DEFAULT_GEOMETRY
+from .search import search
+from .state import GameState
+
+# Game records: a file header (magic, version, checkpoint interval K) followed by games.
+# A game is (result, plies), one uint16 per ply and then the position key after every
+# K-th ply as a uint64. A ply packs start square (7 bits), end square (7 bits), boost
+# and twice flags; captures are not stored, replay takes them from the move generator.
+# Squares are packed by the standard board's width, so only its games can be recorded.
+RECORD_MAGIC = b"CKGR"
+RECORD_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+GAME = struct.Struct("<BH")
+DEFAULT_RECORD_PATH = "games.ckr"
+DEFAULT_CHECKPOINT_PLIES = 16
+BOOST_FLAG, TWICE_FLAG = 1 << 14, 1 << 15
+# result byte: no winner (draw or unfinished), RED won, WHITE won
+RESULTS = {None: 0, RED: 1, WHITE: 2}
+RESULT_NAMES = ("none", "RED", "WHITE")
+
+
+class RecordError(ValueError):
+    pass
+
+
+def _square(sq):
+    return sq[0] * COLS + sq[1]
+
+
+def encode_step(step, use_twice=False):
+    start, end, _, boost = step
+    return _square(start) | _square(end) << 7 | (BOOST_FLAG if boost else 0) | (TWICE_FLAG if use_twice else 0)
+
+
+# (start, end, boost, twice) of an encoded ply, squares as (row, col)
+def decode_step(code):
+    return (divmod(code & 0x7F, COLS), divmod(code >> 7 & 0x7F, COLS),
+            bool(code & BOOST_FLAG), bool(code & TWICE_FLAG))
+
+
+class GameRecorder:
+    # The plies of one game. add() goes right after each step is applied to state, so
+    # that the checkpoint keys are those of the position after the ply.
+    def __init__(self, interval=DEFAULT_CHECKPOINT_PLIES):
+        self.interval = interval
+        self.moves = []
+        self.checkpoints = []
+
+    def add(self, state, step, use_twice=False):
+        if state.board.geometry is not DEFAULT_GEOMETRY:
+            raise RecordError(f"only games on the standard board can be recorded, not {state.board.geometry}")
+        self.moves.append(encode_step(step, use_twice))
+        if len(self.moves) % self.interval == 0:
+            self.checkpoints.append(state.board.zobrist_key(state.turn))
+
+    def to_bytes(self, winner=None):
+        return (GAME.pack(RESULTS[winner], len(self.moves))
+                + struct.pack(f"<{len(self.moves)}H", *self.moves)
+                + struct.pack(f"<{len(self.checkpoints)}Q", *self.checkpoints))
+
+
+class RecordWriter:
+    # Appends games to a record file, creating it with its header if needed. Each
+    # game is written with one write() call once it is over.
+    def __init__(self, path=DEFAULT_RECORD_PATH, interval=DEFAULT_CHECKPOINT_PLIES):
+        self.interval = interval = append_interval(path, interval)
+        self.file = open(path, "ab")
+        if not self.file.tell():
+            self.file.write(HEADER.pack(RECORD_MAGIC, RECORD_VERSION, interval))
+
+    def recorder(self):
+        return GameRecorder(self.interval)
+
+    def write_game(self, recorder, winner=None):
+        if recorder.interval != self.interval:
+            raise RecordError(f"game recorded every {recorder.interval} plies, file expects {self.interval}")
+        self.write_bytes(recorder.to_bytes(winner))
+
+    # A game already packed by GameRecorder.to_bytes (in a worker, say)
+    def write_bytes(self, data):
+        self.file.write(data)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_header(f, path):
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise RecordError(f"{path} is not a game record file")
+    magic, version, interval = HEADER.unpack(data)
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        raise RecordError(f"{path} is not a version {RECORD_VERSION} game record file")
+    return interval
+
+
+def _read_exact(f, size, path):
+    data = f.read(size)
+    if len(data) != size:
+        raise RecordError(f"{path} ends in the middle of a game")
+    return data
+
+
+# Yields (result, moves, checkpoints) per game, reading one game at a time
+def read_games(path):
+    with open(path, "rb") as f:
+        interval = _read_header(f, path)
+        while True:
+            head = f.read(GAME.size)
+            if not head:
+                return
+            if len(head) < GAME.size:
+                raise RecordError(f"{path} ends in the middle of a game")
+            result, plies = GAME.unpack(head)
+            moves = struct.unpack(f"<{plies}H", _read_exact(f, 2 * plies, path))
+            count = plies // interval
+            checkpoints = struct.unpack(f"<{count}Q", _read_exact(f, 8 * count, path))
+            yield result, moves, checkpoints
+
+
+def record_interval(path):
+    with open(path, "rb") as f:
+        return _read_header(f, path)
+
+
+# The checkpoint interval of games appended to path: the file's own, or interval when
+# the file is new
+def append_interval(path, interval=DEFAULT_CHECKPOINT_PLIES):
+    if os.path.exists(path) and os.path.getsize(path):
+        return record_interval(path)
+    return interval
+
+
+# Yields (ply, state, step, use_twice) before each ply is played on state. The same
+# GameState is yielded every time, so copy it to keep a position. A checkpoint that
+# does not match the replayed position raises RecordError.
+def replay_game(moves, checkpoints, interval):
+    state = GameState()
+    for ply, code in enumerate(moves):
+        start, end, boost, use_twice = decode_step(code)
+        piece = state.board.get_piece(*start)
+        step = state.valid_moves(piece, use_boost=boost).get(end) if piece and piece.color == state.turn else None
+        if step is None or step[3] != boost:
+            raise RecordError(f"illegal move {start}->{end} at ply {ply}")
+        yield ply, state, step, use_twice
+        state.apply(step, use_twice)
+        if (ply + 1) % interval == 0 and checkpoints[ply // interval] != state.board.zobrist_key(state.turn):
+            raise RecordError(f"position key mismatch after ply {ply}")
+
+
+# Yields (game, ply, state, step, use_twice) over every game in path, as replay_game does
+def replay(path):
+    interval = record_interval(path)
+    for game, (_, moves, checkpoints) in enumerate(read_games(path)):
+        for ply, state, step, use_twice in replay_game(moves, checkpoints, interval):
+            yield game, ply, state, step, use_twice
+
+
+def _analyze_game(index, result, moves, checkpoints, interval, depth, weights):
+    tt = TranspositionTable()
+    scores = []
+    agreed = 0
+    for _, state, step, _ in replay_game(moves, checkpoints, interval):
+        score, best, _ = search(state, depth=depth, tt=tt, weights=weights)
+        scores.append(round(score, 4))
+        agreed += bool(best) and best[0] == step
+    return {"game": index, "result": RESULT_NAMES[result], "plies": len(moves), "scores": scores,
+            "agreement": round(agreed / len(moves), 4) if moves else 0.0}
+
+
+# Re-score every recorded position with a depth-limited search across worker processes,
+# appending one JSON line per game to out_path (if given). Only a few games per worker
+# are in flight at a time, so files of any size stream through.
+def analyze(path, depth=4, workers=None, out_path=None, weights=None):
+    workers = workers or os.cpu_count() or 1
+    interval = record_interval(path)
+    games = positions = 0
+    start = time.perf_counter()
+    out = open(out_path, "a") if out_path else None
+
+    def collect(done):
+        nonlocal games, positions
+        for future in done:
+            result = future.result()
+            games += 1
+            positions += result["plies"]
+            if out:
+                out.write(json.dumps(result) + "\n")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for index, (result, moves, checkpoints) in enumerate(read_games(path)):
+                if len(pending) >= 4 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(executor.submit(_analyze_game, index, result, moves, checkpoints,
+                                            interval, depth, weights))
+            collect(wait(pending)[0])
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    return {"games": games, "positions": positions, "workers": workers, "seconds": round(elapsed, 3),
+            "positions_per_sec": round(positions / elapsed, 1) if elapsed else 0.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay or analyze a game record file")
+    parser.add_argument("path", nargs="?", default=DEFAULT_RECORD_PATH)
+    parser.add_argument("--analyze", action="store_true", help="re-score every position with a search")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="JSON lines file for --analyze results")
+    args = parser.parse_args()
+    if args.analyze:
+        print(json.dumps(analyze(args.path, args.depth, args.workers, args.out)))
+    else:
+        start = time.perf_counter()
+        games = plies = 0
+        for game, *_ in replay(args.path):
+            games = game + 1
+            plies += 1
+        elapsed = time.perf_counter() - start
+        print(json.dumps({"games": games, "plies": plies, "seconds": round(elapsed, 3),
+                          "plies_per_sec": round(plies / elapsed, 1) if elapsed else 0.0}))
@@ -0,0 +1,70 @@
+from minimax.algorithm import QUIESCENCE_NODES, minimax, iterative_deepening
+from ..bitboard import BitBoard
+from ..constants import WHITE
+from ..geometry import DEFAULT_GEOMETRY
+from ..move import Move
+
+
+# Pick a move for the side to move in a GameState. With time_budget_ms the search
+# deepens until the budget is used, otherwise it searches to a fixed depth.
+# Returns (score, move, depth); move is a Move (or None without a legal move) and
+# score is from WHITE's point of view. weights overrides
+# constants.EVAL_WEIGHTS for this search. A position found in book (an OpeningBook)
+# is answered from it without searching, with the depth the book entry was searched to.
+# With a tablebase (a Tablebase) a root position in it is played from the table at
+# depth 0, and the search scores leaves in it exactly.
+# stats (a minimax.stats.SearchStats) collects counters and timings for this move.
+# Setting stop (a threading.Event) ends the search early: iterative deepening answers
+# from its last finished depth, a fixed-depth search raises SearchTimeout.
+# quiescence_nodes bounds the capture/promotion search past each leaf (0 turns it off).
+# With parallel (a minimax.parallel.ParallelSearch) the root moves are searched across
+# its worker processes, which keep their own transposition tables: tt and stats then
+# only see what is searched in this process.
+def search(state, depth=2, time_budget_ms=None, tt=None, weights=None, book=None, tablebase=None, stats=None,
+           stop=None, quiescence_nodes=QUIESCENCE_NODES, parallel=None):
+    if stats is None:
+        score, move, depth = _search(state, depth, time_budget_ms, tt, weights, book, tablebase, None, stop,
+                                     quiescence_nodes, parallel)
+    else:
+        stats.start(tt)
+        try:
+            score, move, depth = _search(state, depth, time_budget_ms, tt, weights, book, tablebase, stats,
+                                         stop, quiescence_nodes, parallel)
+        finally:
+            stats.stop(tt)
+    return score, Move(move) if move else move, depth
+
+
+def _search(state, depth, time_budget_ms, tt, weights, book, tablebase, stats, stop, quiescence_nodes, parallel):
+    if book is not None:
+        hit = book.probe(state)
+        if stats is not None:
+            stats.book_probes += 1
+            stats.book_hits += hit is not None
+        if hit is not None:
+            return hit
+    if tablebase is not None:
+        hit = tablebase.best_move(state)
+        if stats is not None:
+            stats.tablebase_probes += 1
+            stats.tablebase_hits += hit is not None
+        if hit is not None:
+            return hit[0], hit[1], 0
+    max_player = state.turn == WHITE
+    position = search_position(state.board)
+    if time_budget_ms is not None:
+        deepen = iterative_deepening if parallel is None else parallel.iterative_deepening
+        return deepen(position, max_player, time_budget_ms, tt=tt, weights=weights, tablebase=tablebase,
+                      stats=stats, stop=stop, quiescence_nodes=quiescence_nodes)
+    search_depth = minimax if parallel is None else parallel.search
+    score, move = search_depth(position, depth, max_player, tt=tt, weights=weights, tablebase=tablebase,
+                               stats=stats, stop=stop, quiescence_nodes=quiescence_nodes)
+    if stats is not None:
+        stats.iteration(depth)
+    return score, move, depth
+
+
+# The position the search plays on: a BitBoard of the board for the standard layout,
+# which generates the same moves and scores as the Board, the Board itself otherwise
+def search_position(board):
+    return BitBoard.from_board(board) if board.geometry is DEFAULT_GEOMETRY else board
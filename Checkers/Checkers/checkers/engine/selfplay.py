@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from minimax.algorithm import QUIESCENCE_NODES
+from minimax.parallel import ParallelSearch
+from minimax.transposition import TranspositionTable
+from ..constants import RED, WHITE, EVAL_WEIGHTS
+from .book import OpeningBook
+from .record import GameRecorder, RecordWriter
+from .tablebase import Tablebase
+from .weights import load_weights
+from .state import GameState, side_name
+from .search import search
+
+
+class PlayerConfig:
+    # How one side searches: a fixed depth, or iterative deepening within a time budget
+    # book_path and tablebase_path name an opening book and an endgame tablebase file.
+    # With workers > 1 each search is split over that many processes of its own.
+    def __init__(self, depth=2, time_budget_ms=None, weights=None, tt_size=1 << 16, book_path=None,
+                 tablebase_path=None, quiescence_nodes=QUIESCENCE_NODES, workers=1):
+        self.depth = depth
+        self.time_budget_ms = time_budget_ms
+        self.weights = dict(EVAL_WEIGHTS, **(weights or {}))
+        self.tt_size = tt_size
+        self.book_path = book_path
+        self.tablebase_path = tablebase_path
+        self.quiescence_nodes = quiescence_nodes
+        self.workers = workers
+
+    def to_dict(self):
+        return {"depth": self.depth, "time_budget_ms": self.time_budget_ms, "weights": self.weights,
+                "book_path": self.book_path, "tablebase_path": self.tablebase_path,
+                "quiescence_nodes": self.quiescence_nodes, "workers": self.workers}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("depth", 2), data.get("time_budget_ms"), data.get("weights"),
+                   book_path=data.get("book_path"), tablebase_path=data.get("tablebase_path"),
+                   quiescence_nodes=data.get("quiescence_nodes", QUIESCENCE_NODES), workers=data.get("workers", 1))
+
+
+# Play one game. The first random_plies moves are picked at random (from the seed) so
+# that games between the same two deterministic players do not all repeat. With
+# record_interval set the packed game record comes back under "record".
+def play_game(red, white, seed=0, random_plies=2, max_plies=200, record_interval=None):
+    rng = random.Random(seed)
+    state = GameState()
+    players = {RED: red, WHITE: white}
+    tables = {color: TranspositionTable(config.tt_size) for color, config in players.items()}
+    books = {color: OpeningBook(config.book_path) if config.book_path else None
+             for color, config in players.items()}
+    tablebases = {color: Tablebase(config.tablebase_path) if config.tablebase_path else None
+                  for color, config in players.items()}
+    parallels = {color: ParallelSearch(config.workers) if config.workers > 1 else None
+                 for color, config in players.items()}
+    recorder = GameRecorder(record_interval) if record_interval else None
+    plies = 0
+    start = time.perf_counter()
+    winner = None
+    try:
+        while plies < max_plies:
+            winner = state.winner()
+            if winner is not None:
+                break
+            if plies < random_plies:
+                move = (rng.choice(state.legal_moves()),)
+            else:
+                config = players[state.turn]
+                _, move, _ = search(state, depth=config.depth, time_budget_ms=config.time_budget_ms,
+                                    tt=tables[state.turn], weights=config.weights, book=books[state.turn],
+                                    tablebase=tablebases[state.turn], quiescence_nodes=config.quiescence_nodes,
+                                    parallel=parallels[state.turn])
+            for step in move:
+                state.apply(step)
+                if recorder:
+                    recorder.add(state, step)
+            plies += 1
+    finally:
+        for parallel in parallels.values():
+            if parallel is not None:
+                parallel.close()
+    result = {
+        "seed": seed,
+        "winner": side_name(winner) if winner is not None else "draw",
+        "plies": plies,
+        "red_left": state.board.red_left,
+        "white_left": state.board.white_left,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+    if recorder:
+        result["record"] = recorder.to_bytes(winner)
+    return result
+
+
+def _play_pairing(index, a, b, seed, random_plies, max_plies, record_interval=None):
+    # Configs alternate colours so that each one plays both sides equally often
+    a_is_red = index % 2 == 0
+    red, white = (a, b) if a_is_red else (b, a)
+    result = play_game(PlayerConfig.from_dict(red), PlayerConfig.from_dict(white),
+                       seed, random_plies, max_plies, record_interval)
+    result["game"] = index
+    result["a_color"] = "RED" if a_is_red else "WHITE"
+    if result["winner"] == "draw":
+        result["result"] = "draw"
+    else:
+        result["result"] = "a" if result["winner"] == result["a_color"] else "b"
+    return result
+
+
+# Play games between configs a and b across worker processes, appending one JSON line per
+# finished game to out_path (if given) and its moves to the game record file record_path
+# (if given). Returns the summary of the whole run.
+def run_selfplay(games, a, b, workers=None, out_path=None, seed=0, random_plies=2, max_plies=200,
+                 record_path=None):
+    workers = workers or os.cpu_count() or 1
+    a, b = a.to_dict(), b.to_dict()
+    totals = {"a": 0, "b": 0, "draw": 0}
+    plies = 0
+    start = time.perf_counter()
+    out = open(out_path, "a") if out_path else None
+    records = RecordWriter(record_path) if record_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_play_pairing, i, a, b, seed + i, random_plies, max_plies,
+                                       records.interval if records else None)
+                       for i in range(games)]
+            for future in as_completed(futures):
+                result = future.result()
+                if records:
+                    records.write_bytes(result.pop("record"))
+                totals[result["result"]] += 1
+                plies += result["plies"]
+                if out:
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+    finally:
+        if out:
+            out.close()
+        if records:
+            records.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "games": games,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "games_per_sec": round(games / elapsed, 3) if elapsed else 0.0,
+        "avg_plies": round(plies / games, 2) if games else 0.0,
+        "a_win_rate": totals["a"] / games if games else 0.0,
+        "b_win_rate": totals["b"] / games if games else 0.0,
+        "draw_rate": totals["draw"] / games if games else 0.0,
+        "a": a,
+        "b": b,
+    }
+
+
+# weights is inline JSON or the path of a weights file written by the tuner
+def _config_from_args(depth, time_ms, weights, book_path, tablebase_path, quiescence_nodes, search_workers):
+    if weights and os.path.exists(weights):
+        weights = load_weights(weights)
+    elif weights:
+        weights = json.loads(weights)
+    return PlayerConfig(depth, time_ms, weights, book_path=book_path, tablebase_path=tablebase_path,
+                        quiescence_nodes=quiescence_nodes, workers=search_workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless AI-vs-AI self-play")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="selfplay.jsonl")
+    parser.add_argument("--record", default=None, help="append the games' moves to this game record file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random-plies", type=int, default=2)
+    parser.add_argument("--max-plies", type=int, default=200)
+    for name in ("a", "b"):
+        parser.add_argument(f"--{name}-depth", type=int, default=2)
+        parser.add_argument(f"--{name}-time-ms", type=int, default=None)
+        parser.add_argument(f"--{name}-weights", default=None, help='JSON, e.g. \'{"king": 0.6}\', or a weights file')
+        parser.add_argument(f"--{name}-book", default=None, help="opening book file")
+        parser.add_argument(f"--{name}-tablebase", default=None, help="endgame tablebase file")
+        parser.add_argument(f"--{name}-quiescence", type=int, default=QUIESCENCE_NODES,
+                            help="quiescence nodes per leaf, 0 for none")
+        parser.add_argument(f"--{name}-search-workers", type=int, default=1,
+                            help="processes each of this side's searches is split over")
+    args = parser.parse_args()
+    summary = run_selfplay(
+        args.games,
+        _config_from_args(args.a_depth, args.a_time_ms, args.a_weights, args.a_book, args.a_tablebase,
+                          args.a_quiescence, args.a_search_workers),
+        _config_from_args(args.b_depth, args.b_time_ms, args.b_weights, args.b_book, args.b_tablebase,
+                          args.b_quiescence, args.b_search_workers),
+        workers=args.workers, out_path=args.out, seed=args.seed,
+        random_plies=args.random_plies, max_plies=args.max_plies, record_path=args.record,
+    )
+    print(json.dumps(summary))
@@ -0,0 +1,421 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from minimax.transposition import TranspositionTable
+from ..board import Board
+from ..constants import RED, WHITE
+from .book import open_book
+from .search import search
+from .state import GameState, side_name
+from .tablebase import open_tablebase
+from .weights import load_weights
+
+COLORS = {"RED": RED, "WHITE": WHITE}
+
+# Per worker process: one transposition table and the opened book/tablebase, kept
+# between searches (keys cover the whole position, so games can share them)
+_worker_tt = None
+_worker_files = {}
+
+
+def _worker_open(book_path, tablebase_path):
+    key = (book_path, tablebase_path)
+    if key not in _worker_files:
+        _worker_files[key] = (open_book(book_path) if book_path else None,
+                              open_tablebase(tablebase_path) if tablebase_path else None)
+    return _worker_files[key]
+
+
+def _search_worker(rows, turn, boost_available, time_budget_ms, book_path=None, tablebase_path=None,
+                   weights=None):
+    global _worker_tt
+    if _worker_tt is None:
+        _worker_tt = TranspositionTable()
+    book, tablebase = _worker_open(book_path, tablebase_path)
+    state = GameState(Board.from_rows(rows, boost_available))
+    state.turn = turn
+    start = time.perf_counter()
+    score, move, depth = search(state, time_budget_ms=time_budget_ms, tt=_worker_tt, book=book,
+                                tablebase=tablebase, weights=weights)
+    return score, move, depth, time.perf_counter() - start
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class SearchScheduler:
+    # AI searches for every session share one process pool. Searches take a worker slot
+    # in the order they were requested (asyncio.Semaphore wakes waiters first come, first
+    # served) and a session has at most one search outstanding, so no game can starve
+    # another. Beyond max_pending queued or running searches new work is refused.
+    def __init__(self, workers=None, max_pending=64):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = None
+        self.pending = 0
+        self.restarts = 0
+
+    @property
+    def full(self):
+        return self.pending >= self.max_pending
+
+    # (queue wait in seconds, worker result). A worker process that dies breaks the whole
+    # pool; the search fails with BrokenProcessPool and a fresh pool takes later ones.
+    async def run(self, fn, *args):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.workers)
+        self.pending += 1
+        queued = time.perf_counter()
+        try:
+            async with self.slots:
+                wait = time.perf_counter() - queued
+                executor = self.executor
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    if self.executor is executor:
+                        executor.shutdown(wait=False)
+                        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                        self.restarts += 1
+                    raise
+        finally:
+            self.pending -= 1
+        return wait, result
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+class GameSession:
+    def __init__(self, session_id, ai_colors, time_budget_ms):
+        self.id = session_id
+        self.state = GameState()
+        self.ai_colors = ai_colors
+        self.time_budget_ms = time_budget_ms
+        self.plies = 0
+        self.ai_task = None
+        # why the game was ended early (the AI's searches kept failing), or None
+        self.error = None
+        self.subscribers = []
+        self.metrics = {
+            "moves": 0,
+            "searches": 0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+            "search_seconds": 0.0,
+            "max_search_seconds": 0.0,
+            "rejected": 0,
+            "search_errors": 0,
+        }
+
+    def snapshot(self):
+        winner = self.state.winner()
+        return {
+            "session": self.id,
+            "rows": self.state.board.to_rows(),
+            "turn": side_name(self.state.turn),
+            "boost_available": dict(self.state.board.boost_available),
+            "twice_used": {side_name(color): used for color, used in self.state.twice_used.items()},
+            "plies": self.plies,
+            "winner": side_name(winner) if winner is not None else None,
+            "ai": [side_name(color) for color in self.ai_colors],
+            "error": self.error,
+        }
+
+    def record_search(self, wait, seconds):
+        metrics = self.metrics
+        metrics["searches"] += 1
+        metrics["queue_wait_seconds"] += wait
+        metrics["max_queue_wait_seconds"] = max(metrics["max_queue_wait_seconds"], wait)
+        metrics["search_seconds"] += seconds
+        metrics["max_search_seconds"] = max(metrics["max_search_seconds"], seconds)
+
+
+class GameServer:
+    # Hosts many games under GameState rules. Requests and replies are JSON-ready dicts
+    # (see handle()); state changes are pushed to every subscriber of a session as
+    # {"event": "state", ...}, and a failed AI search as {"event": "error", ...} with the
+    # error and the state. Subscribers are bounded queues: a client that falls behind
+    # loses its oldest pushes rather than holding up the games.
+    # A failed search is retried search_retries times before the game is ended with the
+    # error. search_worker is the function the pool runs for a search.
+    def __init__(self, workers=None, max_pending=64, max_sessions=1024, push_queue_size=16,
+                 default_time_budget_ms=200, book_path=None, tablebase_path=None, weights_path=None,
+                 search_retries=1, search_worker=_search_worker):
+        self.scheduler = SearchScheduler(workers, max_pending)
+        self.search_retries = search_retries
+        self.search_worker = search_worker
+        self.max_sessions = max_sessions
+        self.push_queue_size = push_queue_size
+        self.default_time_budget_ms = default_time_budget_ms
+        self.book_path = book_path
+        self.tablebase_path = tablebase_path
+        self.weights = load_weights(weights_path)
+        self.sessions = {}
+        self._ids = itertools.count(1)
+
+    async def handle(self, request):
+        op = request.get("op")
+        handler = getattr(self, f"_op_{op}", None)
+        if handler is None:
+            return {"ok": False, "error": f"unknown op: {op}"}
+        try:
+            return await handler(request)
+        except (KeyError, ValueError, TypeError) as error:
+            return {"ok": False, "error": f"bad request: {error}"}
+        except ServerBusy as error:
+            return {"ok": False, "error": str(error), "busy": True}
+
+    def _session(self, request):
+        session = self.sessions.get(request["session"])
+        if session is None:
+            raise ValueError(f"no session {request['session']}")
+        return session
+
+    async def _op_new_game(self, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise ServerBusy("too many sessions")
+        ai_colors = [COLORS[name] for name in request.get("ai", ["WHITE"])]
+        budget = int(request.get("time_budget_ms", self.default_time_budget_ms))
+        session = GameSession(next(self._ids), ai_colors, budget)
+        self.sessions[session.id] = session
+        self._start_ai(session)
+        return {"ok": True, "session": session.id, "state": session.snapshot()}
+
+    async def _op_state(self, request):
+        return {"ok": True, "state": self._session(request).snapshot()}
+
+    async def _op_metrics(self, request):
+        if "session" in request:
+            return {"ok": True, "metrics": dict(self._session(request).metrics)}
+        return {"ok": True, "metrics": self.metrics()}
+
+    async def _op_close(self, request):
+        session = self.sessions.pop(request["session"], None)
+        if session is not None and session.ai_task is not None:
+            session.ai_task.cancel()
+        return {"ok": True}
+
+    # {"op": "move", "session": id, "from": [r, c], "to": [r, c], "boost": false, "twice": false}
+    async def _op_move(self, request):
+        session = self._session(request)
+        state = session.state
+        if session.error is not None:
+            return {"ok": False, "error": f"game ended: {session.error}"}
+        if state.winner() is not None:
+            return {"ok": False, "error": "game over"}
+        if state.turn in session.ai_colors or session.ai_task is not None:
+            return {"ok": False, "error": "not your turn"}
+        if session.ai_colors and self.scheduler.full:
+            session.metrics["rejected"] += 1
+            raise ServerBusy("search queue full, retry later")
+        start, end = tuple(request["from"]), tuple(request["to"])
+        boost = bool(request.get("boost", False))
+        step = next((step for step in state.legal_moves()
+                     if step[0] == start and step[1] == end and step[3] == boost), None)
+        if step is None:
+            return {"ok": False, "error": "illegal move"}
+        state.apply(step, bool(request.get("twice", False)))
+        session.plies += 1
+        session.metrics["moves"] += 1
+        self._push(session)
+        self._start_ai(session)
+        return {"ok": True, "state": session.snapshot()}
+
+    def subscribe(self, session_id):
+        queue = asyncio.Queue(self.push_queue_size)
+        self.sessions[session_id].subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, session_id, queue):
+        session = self.sessions.get(session_id)
+        if session is not None and queue in session.subscribers:
+            session.subscribers.remove(queue)
+
+    def _push(self, session, event="state", **fields):
+        message = dict(fields, event=event, state=session.snapshot())
+        for queue in session.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def _start_ai(self, session):
+        if (session.ai_task is None and session.error is None and session.state.turn in session.ai_colors
+                and session.state.winner() is None):
+            session.ai_task = asyncio.get_running_loop().create_task(self._play_ai(session))
+
+    # Play the AI's moves, including extra turns, until a human is to move or the game ends.
+    # Every failed search is counted and pushed to the subscribers; once it has failed
+    # search_retries more times in a row the game is ended with the error.
+    async def _play_ai(self, session):
+        state = session.state
+        failures = 0
+        try:
+            while state.turn in session.ai_colors and state.winner() is None:
+                try:
+                    wait, (score, move, depth, seconds) = await self.scheduler.run(
+                        self.search_worker, state.board.to_rows(), state.turn, dict(state.board.boost_available),
+                        session.time_budget_ms, self.book_path, self.tablebase_path, self.weights)
+                    if move is not None and session.id in self.sessions:
+                        state.play(move)
+                except Exception as error:
+                    failures += 1
+                    session.metrics["search_errors"] += 1
+                    message = f"AI search failed: {error!r}"
+                    if failures > self.search_retries:
+                        session.error = message
+                    self._push(session, "error", error=message)
+                    if session.error is not None:
+                        break
+                    continue
+                failures = 0
+                session.record_search(wait, seconds)
+                if session.id not in self.sessions or move is None:
+                    break
+                session.plies += 1
+                session.metrics["moves"] += 1
+                self._push(session)
+        finally:
+            session.ai_task = None
+
+    def metrics(self):
+        return {
+            "sessions": len(self.sessions),
+            "pending_searches": self.scheduler.pending,
+            "workers": self.scheduler.workers,
+            "searches": sum(s.metrics["searches"] for s in self.sessions.values()),
+            "rejected": sum(s.metrics["rejected"] for s in self.sessions.values()),
+            "search_errors": sum(s.metrics["search_errors"] for s in self.sessions.values()),
+            "pool_restarts": self.scheduler.restarts,
+        }
+
+    # One JSON object per line in each direction. A connection can subscribe to any
+    # number of sessions with {"op": "subscribe", "session": id}.
+    async def _serve_connection(self, reader, writer):
+        lock = asyncio.Lock()
+        forwarders = []
+
+        async def send(message):
+            async with lock:
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+
+        async def forward(queue):
+            while True:
+                await send(await queue.get())
+
+        subscriptions = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    await send({"ok": False, "error": "invalid JSON"})
+                    continue
+                if request.get("op") == "subscribe":
+                    if request.get("session") not in self.sessions:
+                        await send({"ok": False, "error": "no such session"})
+                        continue
+                    queue = self.subscribe(request["session"])
+                    subscriptions.append((request["session"], queue))
+                    forwarders.append(asyncio.get_running_loop().create_task(forward(queue)))
+                    await send({"ok": True})
+                else:
+                    await send(await self.handle(request))
+        finally:
+            for task in forwarders:
+                task.cancel()
+            for session_id, queue in subscriptions:
+                self.unsubscribe(session_id, queue)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        for session in self.sessions.values():
+            if session.ai_task is not None:
+                session.ai_task.cancel()
+        self.sessions.clear()
+        self.scheduler.close()
+
+
+class LocalClient:
+    # In-process client: the same requests as the socket protocol, without a socket
+    def __init__(self, server):
+        self.server = server
+        self.session = None
+        self.events = None
+
+    async def request(self, op, **fields):
+        return await self.server.handle(dict(fields, op=op))
+
+    async def new_game(self, ai=("WHITE",), time_budget_ms=None, subscribe=True):
+        fields = {"ai": list(ai)}
+        if time_budget_ms is not None:
+            fields["time_budget_ms"] = time_budget_ms
+        reply = await self.request("new_game", **fields)
+        if reply["ok"]:
+            self.session = reply["session"]
+            if subscribe:
+                self.events = self.server.subscribe(self.session)
+        return reply
+
+    async def move(self, start, end, boost=False, twice=False):
+        return await self.request("move", session=self.session, **{"from": list(start), "to": list(end)},
+                                  boost=boost, twice=twice)
+
+    async def state(self):
+        return (await self.request("state", session=self.session))["state"]
+
+    async def metrics(self):
+        return (await self.request("metrics", session=self.session))["metrics"]
+
+    # Next push ({"event": "state" or "error", "state": ...}), waiting up to timeout seconds
+    async def next_event(self, timeout=None):
+        return await asyncio.wait_for(self.events.get(), timeout)
+
+    async def next_state(self, timeout=None):
+        return (await self.next_event(timeout))["state"]
+
+    async def close(self):
+        if self.events is not None:
+            self.server.unsubscribe(self.session, self.events)
+        return await self.request("close", session=self.session)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve many games over a JSON-lines socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64, help="queued AI searches before moves are refused")
+    parser.add_argument("--max-sessions", type=int, default=1024)
+    parser.add_argument("--time-ms", type=int, default=200, help="default AI time budget per move")
+    parser.add_argument("--book", default=None)
+    parser.add_argument("--tablebase", default=None)
+    parser.add_argument("--weights", default=None, help="weights file from the tuner")
+    args = parser.parse_args()
+
+    game_server = GameServer(args.workers, args.max_pending, args.max_sessions,
+                             default_time_budget_ms=args.time_ms, book_path=args.book,
+                             tablebase_path=args.tablebase, weights_path=args.weights)
+    try:
+        asyncio.run(game_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        game_server.close()
@@ -0,0 +1,91 @@
+from ..board import Board
+from ..constants import RED, WHITE
+
+
+def side_name(color):
+    return "RED" if color == RED else "WHITE"
+
+
+def other(color):
+    return WHITE if color == RED else RED
+
+
+class GameState:
+    # Rules of a whole game without any UI: whose turn it is, the one-shot boost per
+    # side (kept on the board) and the one-shot twice turn after a capture. Moves are
+    # (start, end, skip, boost) steps, the same format the search plays.
+    def __init__(self, board=None):
+        self.board = board if board is not None else Board()
+        self.turn = RED
+        self.twice_used = {RED: False, WHITE: False}
+        self.promoted = False
+
+    def boost_available(self, color):
+        return self.board.boost_available[side_name(color)]
+
+    # Steps for one piece keyed by destination. With use_boost every two-square
+    # diagonal landing is played as the side's boost, as the pygame game does.
+    def valid_moves(self, piece, use_boost=False):
+        allow_boost = use_boost and self.boost_available(piece.color)
+        moves = self.board.get_valid_moves(piece, allow_boost=allow_boost,
+                                           boost_used=not self.boost_available(piece.color))
+        steps = {}
+        for (row, col), skip in moves.items():
+            boost = allow_boost and abs(piece.row - row) == 2 and abs(piece.col - col) == 2
+            steps[(row, col)] = ((piece.row, piece.col), (row, col), tuple((p.row, p.col) for p in skip), boost)
+        return steps
+
+    def legal_moves(self, color=None):
+        color = self.turn if color is None else color
+        return [move[0] for move, _ in self.board.get_side_moves(color, self.boost_available(color))]
+
+    def has_legal_moves(self, color=None):
+        color = self.turn if color is None else color
+        return self.board.has_any_legal_move(color, self.boost_available(color))
+
+    def can_use_twice(self, step):
+        return bool(step[2]) and not self.twice_used[self.turn]
+
+    # Play one step for the side to move. A capture played with use_twice (once per
+    # game) or a promotion gives the same side another move. Returns True in that case.
+    def apply(self, step, use_twice=False):
+        turn = self.turn
+        self.make_move(step, use_twice)
+        return self.turn == turn
+
+    # apply() that returns an undo token for unmake_move(), for searches over whole-game rules
+    def make_move(self, step, use_twice=False):
+        state_token = (self.turn, dict(self.twice_used), self.promoted)
+        twice = use_twice and self.can_use_twice(step)
+        piece = self.board.get_piece(*step[0])
+        was_king = piece.king
+        board_token = self.board.make_move(step)
+        self.promoted = not was_king and piece.king
+        if twice:
+            self.twice_used[self.turn] = True
+        self.end_turn(twice or self.promoted)
+        return board_token, state_token
+
+    def unmake_move(self, token):
+        board_token, (turn, twice_used, promoted) = token
+        self.board.unmake_move(board_token)
+        self.turn = turn
+        self.twice_used = twice_used
+        self.promoted = promoted
+
+    # Play a move returned by the search (one step, or two for a twice turn)
+    def play(self, move):
+        extra_turn = False
+        for step in move:
+            extra_turn = self.apply(step)
+        return extra_turn
+
+    def end_turn(self, extra_turn=False):
+        if not extra_turn:
+            self.turn = other(self.turn)
+
+    def winner(self):
+        winner = self.board.winner()
+        if winner is None and not self.has_legal_moves(self.turn):
+            winner = other(self.turn)
+        return winner
@@ -0,0 +1,305 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from ..bitboard import GEOMETRY, BitBoard, bit, popcount
+from ..constants import ROWS, COLS, RED, WHITE
+from ..geometry import DEFAULT_GEOMETRY, HOLE_SET
+from .hashfile import SortedHashFile, merge_sorted, write_sorted
+from .state import other, side_name
+
+TABLEBASE_MAGIC = b"CKTB"
+# result for the side to move (1 win, -1 loss, 0 draw), plies to the end of the game
+TABLEBASE_PAYLOAD = "bH"
+DEFAULT_PIECES = 2
+DEFAULT_TABLEBASE_PATH = "endgame.bin"
+DEFAULT_SLICE_DIR = "tablebase"
+# Score of a won position, less one per ply to the win so that shorter wins rank higher
+TABLEBASE_WIN = 1000
+
+WIN, LOSS, DRAW = 1, -1, 0
+
+OPEN_SQUARES = [(row, col) for row in range(ROWS) for col in range(COLS)
+                if col % 2 == (row + 1) % 2 and (row, col) not in HOLE_SET]
+BOOST_STATES = [{"RED": red, "WHITE": white} for red in (True, False) for white in (True, False)]
+
+
+def _material(board):
+    red_kings, white_kings = popcount(board.red & board.kings), popcount(board.white & board.kings)
+    return popcount(board.red) - red_kings, red_kings, popcount(board.white) - white_kings, white_kings
+
+
+def _score(result, distance, color):
+    # (result, distance) for color to move as a score from WHITE's point of view
+    score = 0 if result == DRAW else result * (TABLEBASE_WIN - distance)
+    return score if color == WHITE else -score
+
+
+def _better(a, b):
+    # Preferred (result, distance) for the side choosing: quick wins, then draws, then slow losses
+    rank = lambda value: (value[0], -value[1] if value[0] == WIN else value[1])
+    return a if b is None or rank(a) > rank(b) else b
+
+
+class Tablebase:
+    # Game-theoretic values of every position with at most max_pieces pieces, by
+    # Zobrist key with the side to move, under GameState rules without twice turns.
+    # max_pieces is the count the file was built with, read from its header.
+    def __init__(self, path=DEFAULT_TABLEBASE_PATH):
+        self.path = path
+        self.table = SortedHashFile(path, TABLEBASE_MAGIC, TABLEBASE_PAYLOAD)
+        self.max_pieces = self.table.info
+
+    # Sent to worker processes by path; each one maps the file itself
+    def __reduce__(self):
+        return Tablebase, (self.path,)
+
+    # (result, distance) for color to move, or None outside the table. Tables are
+    # built for the standard board only.
+    def probe(self, board, color):
+        if board.red_left + board.white_left > self.max_pieces or board.geometry is not DEFAULT_GEOMETRY:
+            return None
+        return self.table.get(board.zobrist_key(color))
+
+    # probe() as a search score from WHITE's point of view
+    def score(self, board, color):
+        entry = self.probe(board, color)
+        if entry is None:
+            return None
+        return _score(entry[0], entry[1], color)
+
+    # (score, move) keeping the best tablebase result for the side to move, or None
+    # when the position or one of its successors is not in the table
+    def best_move(self, state):
+        color = state.turn
+        if self.probe(state.board, color) is None:
+            return None
+        best, best_move = None, None
+        for step in state.legal_moves():
+            token = state.make_move(step)
+            try:
+                if state.board.winner() is not None:
+                    value = (WIN, 1)
+                else:
+                    entry = self.probe(state.board, state.turn)
+                    if entry is None:
+                        return None
+                    result = entry[0] if state.turn == color else -entry[0]
+                    value = (result, entry[1] + 1)
+            finally:
+                state.unmake_move(token)
+            if _better(value, best) is value:
+                best, best_move = value, (step,)
+        if best_move is None:
+            return None
+        return _score(best[0], best[1], color), best_move
+
+    def close(self):
+        self.table.close()
+
+
+# The tablebase if path exists, otherwise None
+def open_tablebase(path=DEFAULT_TABLEBASE_PATH):
+    return Tablebase(path) if os.path.exists(path) else None
+
+
+# Material signatures (red men, red kings, white men, white kings) with both sides on
+# the board, grouped into waves that only depend on earlier waves: a capture removes a
+# piece and a promotion turns a man into a king.
+def slice_waves(max_pieces):
+    waves = {}
+    for red in range(1, max_pieces):
+        for white in range(1, max_pieces - red + 1):
+            for red_kings in range(red + 1):
+                for white_kings in range(white + 1):
+                    material = (red - red_kings, red_kings, white - white_kings, white_kings)
+                    men = material[0] + material[2]
+                    waves.setdefault((red + white, men), []).append(material)
+    return [waves[key] for key in sorted(waves)]
+
+
+def slice_path(directory, material):
+    return os.path.join(directory, "r{}{}w{}{}.bin".format(*material))
+
+
+def _placements(material):
+    red_men, red_kings, white_men, white_kings = material
+    groups = [
+        ("r", [sq for sq in OPEN_SQUARES if sq[0] != 0], red_men),
+        ("R", OPEN_SQUARES, red_kings),
+        ("w", [sq for sq in OPEN_SQUARES if sq[0] != ROWS - 1], white_men),
+        ("W", OPEN_SQUARES, white_kings),
+    ]
+
+    def place(index, used):
+        if index == len(groups):
+            yield dict(used)
+            return
+        char, squares, count = groups[index]
+        for chosen in combinations([sq for sq in squares if sq not in used], count):
+            yield from place(index + 1, {**used, **{sq: char for sq in chosen}})
+
+    yield from place(0, {})
+
+
+def _rows(placement):
+    return ["".join(placement.get((row, col), ".") for col in range(COLS)) for row in range(ROWS)]
+
+
+# (red, white, kings) masks of a placement
+def _masks(placement):
+    red = white = kings = 0
+    for sq, char in placement.items():
+        b = bit(*sq)
+        if char in "rR":
+            red |= b
+        else:
+            white |= b
+        if char.isupper():
+            kings |= b
+    return red, white, kings
+
+
+# Solve one material slice by retrograde analysis. Moves that leave the slice (captures
+# and promotions) are looked up in the slice files already in directory; moves inside it
+# are resolved backwards from the positions whose outcome is known, one distance at a
+# time. A position is lost once every one of its moves is known to lose, and drawn if
+# it is never resolved. Positions are walked on BitBoards, which have the same moves and
+# keys as Board and GameState without twice turns: a promotion moves again.
+def solve_slice(material, directory):
+    keys = []
+    tables = {}
+    # (child key, parent index) for every move that stays in the slice
+    edges = []
+    remaining = []
+    # buckets[distance] holds (position, result of one of its moves for the side to move)
+    buckets = {}
+    for placement in _placements(material):
+        red, white, kings = _masks(placement)
+        for color in (RED, WHITE):
+            side, other_side = side_name(color), side_name(other(color))
+            for own_boost in (True, False):
+                # The opponent's boost only changes the keys, so the moves are played once
+                # with it off and the two positions differ by its key
+                board = BitBoard(red, white, kings, {side: own_boost, other_side: False})
+                moves = board.get_side_moves(color, own_boost)
+                # (child key with the opponent's boost off, side to move, material or None
+                # inside the slice) per move that does not win outright
+                children = []
+                won = False
+                for (step,), _ in moves:
+                    was_king = board.is_king(*step[0])
+                    token = board.make_move(step)
+                    promoted = not was_king and board.is_king(*step[1])
+                    turn = color if promoted else other(color)
+                    if board.winner() is not None:
+                        won = True
+                    else:
+                        child = _material(board) if step[2] or promoted else None
+                        children.append((board.zobrist_key(turn), turn, child))
+                    board.unmake_move(token)
+                for other_boost in (True, False):
+                    flip = GEOMETRY.boost_keys[other_side] if other_boost else 0
+                    i = len(keys)
+                    keys.append(board.zobrist_key(color) ^ flip)
+                    remaining.append(len(moves))
+                    if not moves:
+                        buckets.setdefault(0, []).append((i, None))
+                    elif won:
+                        buckets.setdefault(1, []).append((i, WIN))
+                    for key, turn, child in children:
+                        if child is None:
+                            edges.append((key ^ flip, i))
+                            continue
+                        if child not in tables:
+                            tables[child] = SortedHashFile(slice_path(directory, child), TABLEBASE_MAGIC,
+                                                           TABLEBASE_PAYLOAD)
+                        result, distance = tables[child].get(key ^ flip)
+                        if turn != color:
+                            result = -result
+                        if result != DRAW:
+                            buckets.setdefault(distance + 1, []).append((i, result))
+    for table in tables.values():
+        table.close()
+
+    index = {key: i for i, key in enumerate(keys)}
+    parents = [[] for _ in keys]
+    for child_key, parent in edges:
+        parents[index[child_key]].append(parent)
+    del edges
+
+    values = [None] * len(keys)
+    distance = 0
+    while buckets:
+        for i, result in buckets.pop(distance, ()):
+            if values[i] is not None:
+                continue
+            if result is None:
+                values[i] = (LOSS, distance)
+            elif result == WIN:
+                values[i] = (WIN, distance)
+            else:
+                remaining[i] -= 1
+                if remaining[i]:
+                    continue
+                values[i] = (LOSS, distance)
+            # A loss here is a winning move for every parent, a win a losing one
+            parent_result = WIN if values[i][0] == LOSS else LOSS
+            for parent in parents[i]:
+                buckets.setdefault(distance + 1, []).append((parent, parent_result))
+        distance += 1
+
+    records = [(key, values[i] or (DRAW, 0)) for i, key in enumerate(keys)]
+    write_sorted(slice_path(directory, material), TABLEBASE_MAGIC, TABLEBASE_PAYLOAD, records)
+    counts = {WIN: 0, LOSS: 0, DRAW: 0}
+    for _, (result, _) in records:
+        counts[result] += 1
+    return material, counts
+
+
+# Generate every slice with at most max_pieces pieces into directory, skipping slices
+# already on disk so an interrupted run picks up where it stopped, then merge the
+# slices into out_path. Slices of one wave are solved in parallel. The slice files are
+# sorted already, so the merge streams them and never holds the table in memory.
+def build_tablebase(max_pieces=DEFAULT_PIECES, directory=DEFAULT_SLICE_DIR, out_path=DEFAULT_TABLEBASE_PATH,
+                    workers=None, log=print):
+    os.makedirs(directory, exist_ok=True)
+    materials = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for wave in slice_waves(max_pieces):
+            materials.extend(wave)
+            pending = [material for material in wave if not os.path.exists(slice_path(directory, material))]
+            for material, counts in executor.map(solve_slice, pending, [directory] * len(pending)):
+                log(f"{slice_path(directory, material)}: {counts[WIN]} won, {counts[LOSS]} lost, "
+                    f"{counts[DRAW]} drawn")
+
+    merge_slices(materials, directory, out_path, max_pieces)
+    return len(materials)
+
+
+# Merge the slice files of materials in directory into the tablebase out_path, whose
+# header records that it holds every position of up to max_pieces pieces
+def merge_slices(materials, directory, out_path, max_pieces):
+    tables = [SortedHashFile(slice_path(directory, material), TABLEBASE_MAGIC, TABLEBASE_PAYLOAD)
+              for material in materials]
+    try:
+        merge_sorted(out_path, TABLEBASE_MAGIC, TABLEBASE_PAYLOAD, [table.items() for table in tables],
+                     max_pieces)
+    finally:
+        for table in tables:
+            table.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the endgame tablebase by retrograde analysis")
+    parser.add_argument("--pieces", type=int, default=DEFAULT_PIECES, help="largest piece count to solve")
+    parser.add_argument("--dir", default=DEFAULT_SLICE_DIR, help="directory for the per-material slices")
+    parser.add_argument("--out", default=DEFAULT_TABLEBASE_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build_tablebase(args.pieces, args.dir, args.out, args.workers)
+    print(f"{count} slices merged into {args.out} in {time.perf_counter() - start:.1f}s")
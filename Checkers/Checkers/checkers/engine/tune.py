@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import random
+
+from ..constants import EVAL_WEIGHTS
+from .selfplay import PlayerConfig, run_selfplay
+from .weights import DEFAULT_WEIGHTS_PATH, load_weights, save_weights
+
+# How far one unit of the tuner's internal coordinates moves each weight
+SCALES = {"king": 0.2, "hole": 0.05, "boost": 0.1}
+# Lowest value, in units, of a weight and of its perturbations. No term may change sign,
+# and the floor sits a little above 0 so that a weight driven down to it still gives the
+# two perturbed players different values and can be pushed back up.
+MIN_UNITS = 0.1
+
+
+# SPSA over the evaluation weights. Every iteration perturbs all weights at once by a
+# random +/- step, plays the two perturbed sets against each other in parallel
+# self-play, and moves the weights towards the side that scored better. The current
+# weights are written to out_path after every iteration, so a run can be stopped and
+# resumed from that file. Gains follow Spall's usual 0.602/0.101 decay. match(plus, minus,
+# k) plays the two weight sets and returns a run_selfplay summary; it defaults to
+# games_per_iteration games of self-play.
+def spsa(iterations=50, games_per_iteration=32, workers=None, out_path=DEFAULT_WEIGHTS_PATH, resume=False,
+         depth=2, a=2.0, c=1.0, stability=5, seed=0, random_plies=4, max_plies=150, log=print, match=None):
+    start = 0
+    weights = dict(EVAL_WEIGHTS)
+    if resume and os.path.exists(out_path):
+        with open(out_path) as f:
+            start = json.load(f).get("iteration", 0)
+        weights = load_weights(out_path)
+    rng = random.Random(seed + start)
+    names = sorted(SCALES)
+    units = {name: weights[name] / SCALES[name] for name in names}
+
+    def to_weights(point):
+        return {name: max(MIN_UNITS, point[name]) * SCALES[name] for name in names}
+
+    if match is None:
+        def match(plus, minus, k):
+            return run_selfplay(games_per_iteration, PlayerConfig(depth, weights=plus),
+                                PlayerConfig(depth, weights=minus), workers=workers,
+                                seed=seed + k * games_per_iteration, random_plies=random_plies,
+                                max_plies=max_plies)
+
+    for k in range(start, iterations):
+        a_k = a / (k + 1 + stability) ** 0.602
+        c_k = c / (k + 1) ** 0.101
+        delta = {name: rng.choice((-1, 1)) for name in names}
+        plus = to_weights({name: units[name] + c_k * delta[name] for name in names})
+        minus = to_weights({name: units[name] - c_k * delta[name] for name in names})
+        summary = match(plus, minus, k)
+        # Score of plus over minus in [-1, 1]; draws count for neither
+        result = summary["a_win_rate"] - summary["b_win_rate"]
+        for name in names:
+            units[name] += a_k * result / (2 * c_k * delta[name])
+            units[name] = max(MIN_UNITS, units[name])
+        weights = to_weights(units)
+        save_weights(out_path, weights, iteration=k + 1, games=(k + 1) * games_per_iteration, depth=depth)
+        log(json.dumps({"iteration": k + 1, "result": round(result, 3), "weights": weights,
+                        "games_per_sec": summary["games_per_sec"]}))
+    return weights
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights with SPSA over self-play")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--games", type=int, default=32, help="self-play games per iteration")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=2, help="search depth of both players")
+    parser.add_argument("--out", default=DEFAULT_WEIGHTS_PATH)
+    parser.add_argument("--resume", action="store_true", help="continue from the weights and iteration in --out")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=150)
+    args = parser.parse_args()
+    final = spsa(args.iterations, args.games, args.workers, args.out, args.resume, args.depth,
+                 seed=args.seed, max_plies=args.max_plies)
+    print(json.dumps(final))
@@ -0,0 +1,27 @@
+import json
+import os
+
+from ..constants import EVAL_WEIGHTS
+
+DEFAULT_WEIGHTS_PATH = "weights.json"
+
+
+# Evaluation weights from a tuner output file laid over constants.EVAL_WEIGHTS, or the
+# defaults alone when the file does not exist. Unknown keys in the file are ignored.
+def load_weights(path=DEFAULT_WEIGHTS_PATH):
+    weights = dict(EVAL_WEIGHTS)
+    if path and os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+        stored = data.get("weights", data)
+        weights.update({name: float(stored[name]) for name in EVAL_WEIGHTS if name in stored})
+    return weights
+
+
+# Write weights (plus any extra fields, e.g. how they were tuned) next to path and rename
+# it into place, so a reader never sees a half-written file
+def save_weights(path, weights, **info):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(info, weights=weights), f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+from .constants import ROWS, COLS, HOLES, START_ROWS
+from .zobrist import make_keys
+
+# Directions are indexed 0..3: up-left, up-right, down-left, down-right.
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+UP = (0, 1)
+DOWN = (2, 3)
+
+
+class Geometry:
+    # Per-square lookup tables for one board layout: rows x cols, the hole squares and
+    # the rows of men each side starts with. Build them through get_geometry() so that
+    # every board of a layout shares one set.
+    def __init__(self, rows=ROWS, cols=COLS, holes=HOLES, start_rows=START_ROWS):
+        holes = tuple(sorted(set(map(tuple, holes))))
+        if rows < 4 or cols < 2:
+            raise ValueError(f"a {rows}x{cols} board is too small")
+        if not 0 < start_rows <= (rows - 2) // 2:
+            raise ValueError(f"{start_rows} starting rows do not fit on {rows} rows with two rows between the sides")
+        for row, col in holes:
+            if not self._contains(rows, cols, row, col):
+                raise ValueError(f"hole {(row, col)} is off the {rows}x{cols} board")
+        self.rows, self.cols = rows, cols
+        self.holes = holes
+        self.hole_set = frozenset(holes)
+        self.start_rows = start_rows
+
+        # STEP[row][col][d]: neighbouring square in direction d, None off the board
+        self.step = self._table(lambda row, col, d: self._target(row, col, d, 1))
+        # JUMP[row][col][d]: (jumped square, landing square) for a first jump, None off the board
+        self.jump = self._table(self._jump)
+        # CHAIN_JUMP[row][col][d]: the same for a jump that continues a chain
+        self.chain_jump = self._table(self._chain_jump)
+        # CHAIN_BLOCKED[row][col][d]: True when a chain landing here in direction d cannot continue
+        self.chain_blocked = self._table(self._chain_blocked)
+        # BOOST_LANDING[row][col][d]: square two steps away in direction d, None off the board or on a hole
+        self.boost_landing = self._table(
+            lambda row, col, d: None if self._target(row, col, d, 2) in self.hole_set else self._target(row, col, d, 2)
+        )
+        self.promotion_row = tuple(row == 0 or row == rows - 1 for row in range(rows))
+        # Number of holes orthogonally next to each square, for the hole-adjacency evaluation term
+        self.hole_adjacency = [
+            [sum(1 for hole_r, hole_c in holes if abs(row - hole_r) + abs(col - hole_c) == 1) for col in range(cols)]
+            for row in range(rows)
+        ]
+        self.piece_keys, self.side_key, self.boost_keys = make_keys(rows, cols)
+
+    # Boards are pickled for worker processes; the tables are rebuilt (or found in the
+    # cache) on the other side instead of being sent along
+    def __reduce__(self):
+        return get_geometry, (self.rows, self.cols, self.holes, self.start_rows)
+
+    def __repr__(self):
+        return f"Geometry({self.rows}x{self.cols}, holes={list(self.holes)}, start_rows={self.start_rows})"
+
+    @staticmethod
+    def _contains(rows, cols, row, col):
+        return 0 <= row < rows and 0 <= col < cols
+
+    def is_dark(self, row, col):
+        return col % 2 == (row + 1) % 2
+
+    def _target(self, row, col, d, distance):
+        r, c = row + DIRECTIONS[d][0] * distance, col + DIRECTIONS[d][1] * distance
+        return (r, c) if self._contains(self.rows, self.cols, r, c) else None
+
+    def _jump(self, row, col, d):
+        over, land = self._target(row, col, d, 1), self._target(row, col, d, 2)
+        return (over, land) if land is not None else None
+
+    def _chain_jump(self, row, col, d):
+        # A jump continuing a chain keeps the original traversal's limit: going up it never
+        # lands on the first row.
+        jump = self._jump(row, col, d)
+        if jump is None or (d in UP and jump[1][0] == 0):
+            return None
+        return jump
+
+    def _chain_blocked(self, row, col, d):
+        # After landing here with a downward jump, the chain stops if the square beside the
+        # jumped piece (one row back, one column further along) is a hole
+        dr, dc = DIRECTIONS[d]
+        if dr == -1:
+            return False
+        return (row - 1, col + dc) in self.hole_set
+
+    def _table(self, build):
+        return [[tuple(build(row, col, d) for d in range(4)) for col in range(self.cols)] for row in range(self.rows)]
+
+
+# The shared Geometry of a layout, built the first time it is asked for
+@lru_cache(maxsize=None)
+def _cached_geometry(rows, cols, holes, start_rows):
+    return Geometry(rows, cols, holes, start_rows)
+
+
+def get_geometry(rows=ROWS, cols=COLS, holes=HOLES, start_rows=START_ROWS):
+    return _cached_geometry(rows, cols, tuple(sorted(set(map(tuple, holes)))), start_rows)
+
+
+# The standard board. Its hole set and promotion rows are also exported under their old
+# names for the tablebase and batch modules, which only ever handle this layout.
+DEFAULT_GEOMETRY = get_geometry()
+HOLE_SET = DEFAULT_GEOMETRY.hole_set
+PROMOTION_ROW = DEFAULT_GEOMETRY.promotion_row
@@ -0,0 +1,30 @@
+class Move(tuple):
+    # A move as the search answers it: a tuple of (start, end, captured, boost) steps, one
+    # step, or two when a twice turn follows the first. It still compares equal to (and
+    # iterates like) the plain step tuples the search works with internally, so only the
+    # move actually played is wrapped, and its fields read without touching a board.
+    __slots__ = ()
+
+    @property
+    def start(self):
+        return self[0][0]
+
+    @property
+    def end(self):
+        return self[0][1]
+
+    @property
+    def captured(self):
+        return self[0][2]
+
+    @property
+    def boost(self):
+        return any(step[3] for step in self)
+
+    # The twice follow-up as a Move, or None
+    @property
+    def follow(self):
+        return Move(self[1:]) if len(self) > 1 else None
+
+    def __repr__(self):
+        return f"Move{tuple.__repr__(self)}"
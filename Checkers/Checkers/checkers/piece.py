@@ -1,37 +1,57 @@
-from .constants import RED, WHITE, SQUARE_SIZE, GREY, CROWN
-import pygame
-
-class Piece:
-    PADDING = 15
-    OUTLINE = 2
-
-    def __init__(self, row, col, color):
-        self.row = row
-        self.col = col
-        self.color = color
-        self.king = False
-        self.x = 0
-        self.y = 0
-        self.calc_pos()
-
-    def calc_pos(self):
-        self.x = SQUARE_SIZE * self.col + SQUARE_SIZE // 2
-        self.y = SQUARE_SIZE * self.row + SQUARE_SIZE // 2
-
-    def make_king(self):
-        self.king = True
-    
-    def draw(self, win):
-        radius = SQUARE_SIZE//2 - self.PADDING
-        pygame.draw.circle(win, GREY, (self.x, self.y), radius + self.OUTLINE)
-        pygame.draw.circle(win, self.color, (self.x, self.y), radius)
-        if self.king:
-            win.blit(CROWN, (self.x - CROWN.get_width()//2, self.y - CROWN.get_height()//2))
-
-    def move(self, row, col):
-        self.row = row
-        self.col = col
-        self.calc_pos()
-
-    def __repr__(self):
+from .constants import RED, WHITE, SQUARE_SIZE, GREY, CROWN_PATH, CROWN_SIZE
+
+_crown = None
+
+
+def crown_image():
+    global _crown
+    if _crown is None:
+        import pygame
+        _crown = pygame.transform.scale(pygame.image.load(CROWN_PATH), CROWN_SIZE)
+    return _crown
+
+
+# Pixel centre of a square, for drawing only
+def square_center(row, col):
+    return SQUARE_SIZE * col + SQUARE_SIZE // 2, SQUARE_SIZE * row + SQUARE_SIZE // 2
+
+
+class Piece:
+    # Pieces are copied with every board, so they hold only their game state
+    __slots__ = ("row", "col", "color", "king")
+    PADDING = 15
+    OUTLINE = 2
+
+    def __init__(self, row, col, color):
+        self.row = row
+        self.col = col
+        self.color = color
+        self.king = False
+
+    def copy(self):
+        piece = Piece(self.row, self.col, self.color)
+        piece.king = self.king
+        return piece
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def make_king(self):
+        self.king = True
+    
+    def draw(self, win):
+        import pygame
+        x, y = square_center(self.row, self.col)
+        radius = SQUARE_SIZE//2 - self.PADDING
+        pygame.draw.circle(win, GREY, (x, y), radius + self.OUTLINE)
+        pygame.draw.circle(win, self.color, (x, y), radius)
+        if self.king:
+            crown = crown_image()
+            win.blit(crown, (x - crown.get_width()//2, y - crown.get_height()//2))
+
+    def move(self, row, col):
+        self.row = row
+        self.col = col
+
+    def __repr__(self):
         return str(self.color)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import random
+from .constants import RED, WHITE
+
+
+# (piece_keys, side_key, boost_keys) for a rows x cols board, where
+# piece_keys[row][col][(color, king)]. A fixed seed keeps keys (and anything stored
+# under them) stable between runs.
+def make_keys(rows, cols):
+    rng = random.Random(0x5EED)
+    piece_keys = [
+        [
+            {(color, king): rng.getrandbits(64) for color in (RED, WHITE) for king in (False, True)}
+            for col in range(cols)
+        ]
+        for row in range(rows)
+    ]
+    side_key = rng.getrandbits(64)
+    boost_keys = {"RED": rng.getrandbits(64), "WHITE": rng.getrandbits(64)}
+    return piece_keys, side_key, boost_keys
+
@@ -0,0 +1 @@
+# Lets pytest import the checkers and minimax packages from this directory
@@ -1,150 +1,212 @@
-import pygame
-from checkers.constants import WIDTH, HEIGHT, SQUARE_SIZE, RED, WHITE
-from checkers.game import Game
-from minimax.algorithm import minimax
-import tkinter as tk
-from tkinter import messagebox
-
-# initialize tkinter without opening a window
-tk_root = tk.Tk()
-tk_root.withdraw()
-
-FPS = 60
-
-pygame.init()
-pygame.font.init()
-
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Checkers')
-
-BOOST_BTN = pygame.Rect(WIDTH - 140, HEIGHT - 50, 120, 40)
-
-def get_row_col_from_mouse(pos):
-    x, y = pos
-    row = y // SQUARE_SIZE
-    col = x // SQUARE_SIZE
-    return row, col
-
-def draw_winner(win, color):
-    font = pygame.font.SysFont(None, 72)
-    text = f"{'RED' if color == RED else 'WHITE'} WINS!"
-    text_surface = font.render(text, True, (255, 255, 255))
-    text_rect = text_surface.get_rect(center=(WIDTH/2, HEIGHT/2))
-    win.blit(text_surface, text_rect)
-    pygame.display.update()
-    pygame.time.wait(3000)
-
-def draw_message(win, message):
-    font = pygame.font.SysFont(None, 36)
-    text_surface = font.render(message, True, (255, 255, 255))
-    text_rect = text_surface.get_rect(center=(WIDTH/2, HEIGHT - 70))
-    pygame.draw.rect(win, (0, 0, 0), (0, HEIGHT - 90, WIDTH, 90))
-    win.blit(text_surface, text_rect)
-
-def draw_boost_button(win, game):
-    if game.turn == RED and not game.boost_used[RED]:
-        pygame.draw.rect(win, (70, 130, 180), BOOST_BTN)
-        font = pygame.font.SysFont(None, 28)
-        text = font.render("Use Boost", True, (255, 255, 255))
-        text_rect = text.get_rect(center=BOOST_BTN.center)
-        win.blit(text, text_rect)
-
-def main():
-    run = True
-    clock = pygame.time.Clock()
-    game = Game(WIN)
-    boost_mode = False
-    boost_button_visible = True
-    ai_boost_alert_shown = False
-
-    while run:
-        clock.tick(FPS)
-
-        if game.turn == WHITE:
-            value, new_board = minimax(game.get_board(), 2, WHITE, game)
-            if new_board:
-                new_board.last_boost_used = game.detect_ai_boost(game.get_board(), new_board)
-                game.ai_move(new_board)
-            else:
-                continue
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-
-                if BOOST_BTN.collidepoint(pos) and boost_button_visible and not game.boost_used[RED] and game.turn == RED:
-                    boost_mode = True
-                    boost_button_visible = False
-                    draw_message(WIN, "Boost mode activated!")
-
-                else:
-                    row, col = get_row_col_from_mouse(pos)
-                    use_twice = event.button == 2 and not game.twice_used[RED]
-
-                    if game.turn == RED:
-                        game.select(row, col, boost_mode, use_twice)
-                        boost_mode = False
-
-        game.update()
-
-        if game.turn == RED and not game.boost_used[RED] and boost_button_visible:
-            draw_boost_button(WIN, game)
-
-        # Game messages and popups
-        if game.boost_just_used[RED]:
-            draw_message(WIN, "Boost used!")
-
-        elif game.boost_just_used[WHITE] and not ai_boost_alert_shown:
-            messagebox.showinfo("AI Boost", "AI used Boost!")
-            game.boost_just_used[WHITE] = False
-            ai_boost_alert_shown = True
-
-        if game.twice_pending[RED]:
-            messagebox.showinfo("Twice Turn", "You get another turn (Twice)!")
-            game.twice_pending[RED] = False
-
-        elif game.twice_pending[WHITE]:
-            messagebox.showinfo("Twice Turn", "AI gets another turn (Twice)!")
-            game.twice_pending[WHITE] = False
-
-            # AI does the next move immediately
-            value, new_board = minimax(game.get_board(), 2, WHITE, game)
-            if new_board:
-                new_board.last_boost_used = game.detect_ai_boost(game.get_board(), new_board)
-                game.ai_move(new_board)
-
-        if game.just_got_king:
-            if game.turn == RED:
-                messagebox.showinfo("King crowned!", "You got a King! You get another turn (Twice)!")
-            else:
-                messagebox.showinfo("King crowned!", "AI got a King! It gets another turn (Twice)!")
-                game.twice_pending[WHITE] = True
-            game.just_got_king = False
-
-        if game.turn == RED and not game.has_valid_moves(RED):
-            draw_message(WIN, "No valid moves left. WHITE wins!")
-            pygame.display.update()
-            pygame.time.wait(2000)
-            messagebox.showinfo("Game Over", "No valid moves for RED. WHITE wins!")
-            run = False
-        elif game.turn == WHITE and not game.has_valid_moves(WHITE):
-            draw_message(WIN, "No valid moves left. RED wins!")
-            pygame.display.update()
-            pygame.time.wait(2000)
-            messagebox.showinfo("Game Over", "No valid moves for WHITE. RED wins!")
-            run = False
-
-        winner = game.winner()
-        if winner is not None:
-            draw_winner(WIN, winner)
-            messagebox.showinfo("Game Over", f"{'RED' if winner == RED else 'WHITE'} wins!")
-            run = False
-
-        pygame.display.update()
-
-    pygame.quit()
-
-main()
+import json
+import os
+import pygame
+from checkers.constants import WIDTH, HEIGHT, SQUARE_SIZE, RED, WHITE
+from checkers.game import Game
+from checkers.engine.background import BackgroundSearch
+from checkers.engine.book import open_book
+from checkers.engine.record import DEFAULT_RECORD_PATH, RecordWriter, append_interval
+from checkers.engine.tablebase import open_tablebase
+from checkers.engine.weights import load_weights
+from minimax.parallel import ParallelSearch
+from minimax.stats import SearchStats
+from minimax.transposition import TranspositionTable
+import tkinter as tk
+from tkinter import messagebox
+
+FPS = 60
+# Time the AI may think per move; the search runs off the event loop, so the window
+# keeps drawing while it thinks
+AI_TIME_BUDGET_MS = 1500
+# Longest the AI ponders on the human's turn. Only its transposition table carries
+# over, warm for the AI's own search once the human has moved.
+PONDER_LIMIT_MS = 30000
+# Worker processes the AI's own search is spread over; 1 searches in this process
+AI_WORKERS = int(os.environ.get("CHECKERS_AI_WORKERS", "1"))
+# When set, one JSON line of search statistics is appended to this file per AI move
+SEARCH_LOG = os.environ.get("CHECKERS_SEARCH_LOG")
+# Every game played is appended to this record file (see checkers/engine/record.py)
+GAME_RECORD = os.environ.get("CHECKERS_GAME_RECORD", DEFAULT_RECORD_PATH)
+
+BOOST_BTN = pygame.Rect(WIDTH - 140, HEIGHT - 50, 120, 40)
+
+def get_row_col_from_mouse(pos):
+    x, y = pos
+    row = y // SQUARE_SIZE
+    col = x // SQUARE_SIZE
+    return row, col
+
+def draw_winner(win, color):
+    font = pygame.font.SysFont(None, 72)
+    text = f"{'RED' if color == RED else 'WHITE'} WINS!"
+    text_surface = font.render(text, True, (255, 255, 255))
+    text_rect = text_surface.get_rect(center=(WIDTH/2, HEIGHT/2))
+    win.blit(text_surface, text_rect)
+    pygame.display.update()
+    pygame.time.wait(3000)
+
+def draw_message(win, message):
+    font = pygame.font.SysFont(None, 36)
+    text_surface = font.render(message, True, (255, 255, 255))
+    text_rect = text_surface.get_rect(center=(WIDTH/2, HEIGHT - 70))
+    pygame.draw.rect(win, (0, 0, 0), (0, HEIGHT - 90, WIDTH, 90))
+    win.blit(text_surface, text_rect)
+
+def draw_boost_button(win, game):
+    if game.turn == RED and not game.boost_used[RED]:
+        pygame.draw.rect(win, (70, 130, 180), BOOST_BTN)
+        font = pygame.font.SysFont(None, 28)
+        text = font.render("Use Boost", True, (255, 255, 255))
+        text_rect = text.get_rect(center=BOOST_BTN.center)
+        win.blit(text, text_rect)
+
+def start_ai_search(game, tt, book, tablebase, stats, weights, parallel):
+    return BackgroundSearch(game.state, time_budget_ms=AI_TIME_BUDGET_MS, tt=tt, book=book,
+                            tablebase=tablebase, stats=stats, weights=weights, parallel=parallel)
+
+def finish_ai_search(game, job, stats):
+    value, move, depth = job.result()
+    if stats is not None:
+        with open(SEARCH_LOG, "a") as f:
+            f.write(json.dumps(stats.record(score=value, move=move)) + "\n")
+    if move:
+        game.ai_move(move)
+
+def main():
+    # initialize tkinter without opening a window
+    tk_root = tk.Tk()
+    tk_root.withdraw()
+
+    pygame.init()
+    pygame.font.init()
+
+    WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Checkers')
+
+    run = True
+    clock = pygame.time.Clock()
+    # recorded every as many plies as the games already in the record file
+    game = Game(WIN, append_interval(GAME_RECORD))
+    tt = TranspositionTable()
+    # book.bin from `python -m checkers.engine.book`, endgame.bin from
+    # `python -m checkers.engine.tablebase` and weights.json from
+    # `python -m checkers.engine.tune`, if they have been built
+    book = open_book()
+    tablebase = open_tablebase()
+    stats = SearchStats() if SEARCH_LOG else None
+    weights = load_weights()
+    parallel = ParallelSearch(AI_WORKERS) if AI_WORKERS > 1 else None
+    boost_mode = False
+    boost_button_visible = True
+    ai_boost_alert_shown = False
+    ai_job = None
+    ponder = None
+    ponder_key = None
+
+    while run:
+        clock.tick(FPS)
+
+        if game.turn == WHITE:
+            if ponder is not None:
+                ponder.cancel()
+                ponder = None
+            if ai_job is None:
+                ai_job = start_ai_search(game, tt, book, tablebase, stats, weights, parallel)
+            elif ai_job.done():
+                finish_ai_search(game, ai_job, stats)
+                ai_job = None
+        elif ponder is None or ponder_key != game.board.zobrist_key(RED):
+            # (re)start pondering whenever the position on the human's turn changes
+            if ponder is not None:
+                ponder.cancel()
+            ponder = BackgroundSearch(game.state, time_budget_ms=PONDER_LIMIT_MS, tt=tt, tablebase=tablebase,
+                                      weights=weights)
+            ponder_key = game.board.zobrist_key(RED)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                pos = pygame.mouse.get_pos()
+
+                if BOOST_BTN.collidepoint(pos) and boost_button_visible and not game.boost_used[RED] and game.turn == RED:
+                    boost_mode = True
+                    boost_button_visible = False
+                    draw_message(WIN, "Boost mode activated!")
+
+                else:
+                    row, col = get_row_col_from_mouse(pos)
+                    use_twice = event.button == 2 and not game.twice_used[RED]
+
+                    if game.turn == RED:
+                        game.select(row, col, boost_mode, use_twice)
+                        boost_mode = False
+
+        game.update()
+
+        if ai_job is not None:
+            draw_message(WIN, "AI is thinking...")
+
+        if game.turn == RED and not game.boost_used[RED] and boost_button_visible:
+            draw_boost_button(WIN, game)
+
+        # Game messages and popups
+        if game.boost_just_used[RED]:
+            draw_message(WIN, "Boost used!")
+
+        elif game.boost_just_used[WHITE] and not ai_boost_alert_shown:
+            messagebox.showinfo("AI Boost", "AI used Boost!")
+            game.boost_just_used[WHITE] = False
+            ai_boost_alert_shown = True
+
+        if game.twice_pending[RED]:
+            messagebox.showinfo("Twice Turn", "You get another turn (Twice)!")
+            game.twice_pending[RED] = False
+
+        elif game.twice_pending[WHITE]:
+            messagebox.showinfo("Twice Turn", "AI gets another turn (Twice)!")
+            game.twice_pending[WHITE] = False
+            # the AI's extra move is searched at the top of the next frame
+
+        if game.just_got_king:
+            if game.turn == RED:
+                messagebox.showinfo("King crowned!", "You got a King! You get another turn (Twice)!")
+            else:
+                messagebox.showinfo("King crowned!", "AI got a King! It gets another turn (Twice)!")
+                game.twice_pending[WHITE] = True
+            game.just_got_king = False
+
+        if game.turn == RED and not game.has_valid_moves(RED):
+            draw_message(WIN, "No valid moves left. WHITE wins!")
+            pygame.display.update()
+            pygame.time.wait(2000)
+            messagebox.showinfo("Game Over", "No valid moves for RED. WHITE wins!")
+            run = False
+        elif game.turn == WHITE and not game.has_valid_moves(WHITE):
+            draw_message(WIN, "No valid moves left. RED wins!")
+            pygame.display.update()
+            pygame.time.wait(2000)
+            messagebox.showinfo("Game Over", "No valid moves for WHITE. RED wins!")
+            run = False
+
+        winner = game.winner()
+        if winner is not None:
+            draw_winner(WIN, winner)
+            messagebox.showinfo("Game Over", f"{'RED' if winner == RED else 'WHITE'} wins!")
+            run = False
+
+        pygame.display.update()
+
+    for job in (ai_job, ponder):
+        if job is not None:
+            job.cancel()
+    if parallel is not None:
+        parallel.close()
+    if game.recorder.moves:
+        with RecordWriter(GAME_RECORD) as writer:
+            writer.write_game(game.recorder, game.state.winner())
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,349 @@
-from copy import deepcopy
-import pygame
-
-RED = (255, 0, 0)
-WHITE = (255, 255, 255)
-
-def minimax(position, depth, max_player, game,
-            boost_available={"RED": True, "WHITE": True},
-            alpha=float('-inf'), beta=float('inf')):
-    # Base case
-    if depth == 0 or position.winner() is not None:
-        return position.evaluate(boost_available), position
-
-    if max_player:
-        maxEval = float('-inf')
-        best_move = None
-        for move, used_boost in get_all_moves(position, WHITE, game,
-                                              boost_available["WHITE"],
-                                              boost_used=not boost_available["WHITE"]):
-            new_boost = boost_available.copy()
-            if used_boost:
-                new_boost["WHITE"] = False
-                game.boost_just_used[WHITE] = True  # Show message AI used Boost
-            else:
-                game.boost_just_used[WHITE] = False
-
-            evaluation = minimax(move, depth - 1, False, game, new_boost, alpha, beta)[0]
-            if evaluation > maxEval:
-                maxEval = evaluation
-                best_move = move
-
-            alpha = max(alpha, evaluation)
-            if beta <= alpha:
-                break
-        return maxEval, best_move
-
-    else:
-        minEval = float('inf')
-        best_move = None
-        for move, used_boost in get_all_moves(position, RED, game,
-                                              boost_available["RED"],
-                                              boost_used=not boost_available["RED"]):
-            new_boost = boost_available.copy()
-            if used_boost:
-                new_boost["RED"] = False
-            evaluation = minimax(move, depth - 1, True, game, new_boost, alpha, beta)[0]
-            if evaluation < minEval:
-                minEval = evaluation
-                best_move = move
-
-            beta = min(beta, evaluation)
-            if beta <= alpha:
-                break
-        return minEval, best_move
-
-
-def simulate_move(piece, move, board, game, skip):
-    board.move(piece, move[0], move[1])
-    if skip:
-        board.remove(skip)
-    return board
-
- # Get all possible moves for a given color
-def get_all_moves(board, color, game, boost_available=True, twice_available=False, boost_used=False):
-    moves = []
-    for piece in board.get_all_pieces(color):
-        valid_moves = board.get_valid_moves(piece, boost_used=boost_used)
-        for move, skip in valid_moves.items():
-            temp_board = deepcopy(board)
-            temp_piece = temp_board.get_piece(piece.row, piece.col)
-            new_board = simulate_move(temp_piece, move, temp_board, game, skip)
-
-            just_got_king = not temp_piece.king and (move[0] == 0 or move[0] == board.board.__len__() - 1)
-            if twice_available or just_got_king:
-                for piece2 in new_board.get_all_pieces(color):
-                    valid_moves2 = new_board.get_valid_moves(piece2, boost_used=boost_used)
-                    for move2, skip2 in valid_moves2.items():
-                        temp_board2 = deepcopy(new_board)
-                        temp_piece2 = temp_board2.get_piece(piece2.row, piece2.col)
-                        new_board2 = simulate_move(temp_piece2, move2, temp_board2, game, skip2)
-                        moves.append((new_board2, False))
-            else:
-                moves.append((new_board, False))
-
-        # Boost
-        if boost_available:
-            boost_moves = board.get_valid_moves(piece, allow_boost=True, boost_used=boost_used)
-            for move, skip in boost_moves.items():
-                if move not in valid_moves:
-                    temp_board = deepcopy(board)
-                    temp_piece = temp_board.get_piece(piece.row, piece.col)
-                    new_board = simulate_move(temp_piece, move, temp_board, game, skip)
-                    moves.append((new_board, True))
-    return moves
-
-
-def draw_moves(game, board, piece):
-    valid_moves = board.get_valid_moves(piece)
-    board.draw(game.win)
-    pygame.draw.circle(game.win, (0, 255, 0), (piece.x, piece.y), 50, 5)
-    game.draw_valid_moves(valid_moves.keys())
-    pygame.display.update()
+from copy import deepcopy
+import time
+from checkers.constants import RED, WHITE
+from .transposition import EXACT, LOWER, UPPER, TranspositionTable
+from .ordering import MoveOrdering
+
+
+class SearchTimeout(Exception):
+    pass
+
+# Nodes the quiescence search below one leaf may visit before it stands pat; 0 turns it off
+QUIESCENCE_NODES = 64
+
+# A move is a tuple of (start, end, skip, boost) steps: one step, or two for a twice turn.
+# Search plays them on a single board with make_move/unmake_move instead of copying it.
+def minimax(position, depth, max_player,
+            alpha=float('-inf'), beta=float('inf'), tt=None, deadline=None, pv=None,
+            ordering=None, ply=0, weights=None, tablebase=None, stats=None, stop=None,
+            quiescence_nodes=QUIESCENCE_NODES):
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise SearchTimeout()
+    # stop is a threading.Event (or anything with is_set) that cancels the search
+    if stop is not None and stop.is_set():
+        raise SearchTimeout()
+    if ordering is None:
+        ordering = MoveOrdering()
+    ordering.nodes += 1
+    if stats is not None:
+        stats.nodes += 1
+    # Base case; positions in the endgame tablebase score their exact result
+    if depth == 0 or position.winner() is not None:
+        if tablebase is not None:
+            score = tablebase.score(position, WHITE if max_player else RED)
+            if stats is not None:
+                stats.tablebase_probes += 1
+                stats.tablebase_hits += score is not None
+            if score is not None:
+                return score, None
+        if quiescence_nodes and position.winner() is None:
+            return quiescence(position, max_player, alpha, beta, quiescence_nodes, weights, stats, deadline,
+                              stop), None
+        if stats is None:
+            return position.evaluate(weights=weights), None
+        start = time.perf_counter()
+        score = position.evaluate(weights=weights)
+        stats.evaluate_seconds += time.perf_counter() - start
+        stats.leaf_evals += 1
+        return score, None
+
+    tt_move = None
+    if tt is not None:
+        key = position.zobrist_key(WHITE if max_player else RED)
+        entry = tt.probe(key)
+        if entry is not None:
+            _, entry_depth, score, flag, tt_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score, tt_move
+                elif flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score, tt_move
+        alpha_orig, beta_orig = alpha, beta
+
+    boost_available = position.boost_available
+    if max_player:
+        maxEval = float('-inf')
+        best_move = None
+        if stats is None:
+            moves = get_all_moves(position, WHITE, boost_available["WHITE"],
+                                  boost_used=not boost_available["WHITE"])
+        else:
+            moves = _timed_moves(position, WHITE, boost_available["WHITE"], stats)
+        for i, (move, used_boost) in enumerate(_order_first(ordering.order(position, moves, ply), pv, tt_move)):
+            if stats is None:
+                tokens = [position.make_move(step) for step in move]
+            else:
+                tokens = _timed_make(position, move, stats)
+            try:
+                evaluation = minimax(position, depth - 1, False, alpha, beta, tt, deadline,
+                                     _child_pv(pv, move), ordering, ply + 1, weights, tablebase, stats, stop,
+                                     quiescence_nodes)[0]
+            finally:
+                if stats is None:
+                    for token in reversed(tokens):
+                        position.unmake_move(token)
+                else:
+                    _timed_unmake(position, tokens, stats)
+            # best_move is kept even when every move loses, so a lost position still has a move
+            if evaluation > maxEval or best_move is None:
+                maxEval = evaluation
+                best_move = move
+
+            alpha = max(alpha, evaluation)
+            if beta <= alpha:
+                ordering.record_cutoff(move, ply, depth, i == 0)
+                if stats is not None:
+                    stats.cutoff(ply)
+                break
+        if tt is not None:
+            _store(tt, key, depth, maxEval, best_move, alpha_orig, beta_orig)
+        return maxEval, best_move
+
+    else:
+        minEval = float('inf')
+        best_move = None
+        if stats is None:
+            moves = get_all_moves(position, RED, boost_available["RED"],
+                                  boost_used=not boost_available["RED"])
+        else:
+            moves = _timed_moves(position, RED, boost_available["RED"], stats)
+        for i, (move, used_boost) in enumerate(_order_first(ordering.order(position, moves, ply), pv, tt_move)):
+            if stats is None:
+                tokens = [position.make_move(step) for step in move]
+            else:
+                tokens = _timed_make(position, move, stats)
+            try:
+                evaluation = minimax(position, depth - 1, True, alpha, beta, tt, deadline,
+                                     _child_pv(pv, move), ordering, ply + 1, weights, tablebase, stats, stop,
+                                     quiescence_nodes)[0]
+            finally:
+                if stats is None:
+                    for token in reversed(tokens):
+                        position.unmake_move(token)
+                else:
+                    _timed_unmake(position, tokens, stats)
+            if evaluation < minEval or best_move is None:
+                minEval = evaluation
+                best_move = move
+
+            beta = min(beta, evaluation)
+            if beta <= alpha:
+                ordering.record_cutoff(move, ply, depth, i == 0)
+                if stats is not None:
+                    stats.cutoff(ply)
+                break
+        if tt is not None:
+            _store(tt, key, depth, minEval, best_move, alpha_orig, beta_orig)
+        return minEval, best_move
+
+
+# Past the nominal depth only captures and promotions are searched, so that a leaf is
+# never scored in the middle of an exchange. The side to move may also stand pat on the
+# static evaluation, since no move is forced. After nodes visits every remaining
+# position stands pat. deadline and stop end it as they end minimax(), and with stats
+# its evaluations, move generation and make/unmake are timed like the main search's.
+def quiescence(position, max_player, alpha, beta, nodes=QUIESCENCE_NODES, weights=None, stats=None,
+               deadline=None, stop=None):
+    remaining = nodes
+
+    def visit(max_player, alpha, beta):
+        nonlocal remaining
+        if deadline is not None and time.perf_counter() >= deadline:
+            raise SearchTimeout()
+        if stop is not None and stop.is_set():
+            raise SearchTimeout()
+        remaining -= 1
+        if stats is None:
+            stand_pat = position.evaluate(weights=weights)
+        else:
+            stats.quiescence_nodes += 1
+            stats.leaf_evals += 1
+            start = time.perf_counter()
+            stand_pat = position.evaluate(weights=weights)
+            stats.evaluate_seconds += time.perf_counter() - start
+        if position.winner() is not None:
+            return stand_pat
+        if max_player:
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+        else:
+            if stand_pat <= alpha:
+                return stand_pat
+            beta = min(beta, stand_pat)
+        best = stand_pat
+        color = WHITE if max_player else RED
+        if stats is None:
+            moves = _noisy_moves(position, color)
+        else:
+            start = time.perf_counter()
+            moves = _noisy_moves(position, color)
+            stats.movegen_seconds += time.perf_counter() - start
+        for move in moves:
+            if remaining <= 0:
+                break
+            if stats is None:
+                token = position.make_move(move)
+            else:
+                token = _timed_make(position, (move,), stats)[0]
+            try:
+                score = visit(not max_player, alpha, beta)
+            finally:
+                if stats is None:
+                    position.unmake_move(token)
+                else:
+                    _timed_unmake(position, (token,), stats)
+            if max_player:
+                best = max(best, score)
+                alpha = max(alpha, score)
+            else:
+                best = min(best, score)
+                beta = min(beta, score)
+            if beta <= alpha:
+                break
+        return best
+
+    return visit(max_player, alpha, beta)
+
+
+# Capturing and promoting steps of color, biggest captures first
+def _noisy_moves(position, color):
+    steps = []
+    promotion_row = position.geometry.promotion_row
+    for (step,), _ in position.get_side_moves(color):
+        (row, col), end, skip, _ = step
+        if skip or promotion_row[end[0]] and not position.is_king(row, col):
+            steps.append(step)
+    steps.sort(key=lambda step: len(step[2]), reverse=True)
+    return steps
+
+
+# Move generation and make/unmake with their time added to stats
+def _timed_moves(position, color, boost_available, stats):
+    start = time.perf_counter()
+    moves = get_all_moves(position, color, boost_available, boost_used=not boost_available)
+    stats.movegen_seconds += time.perf_counter() - start
+    return moves
+
+
+def _timed_make(position, move, stats):
+    start = time.perf_counter()
+    tokens = [position.make_move(step) for step in move]
+    stats.make_unmake_seconds += time.perf_counter() - start
+    return tokens
+
+
+def _timed_unmake(position, tokens, stats):
+    start = time.perf_counter()
+    for token in reversed(tokens):
+        position.unmake_move(token)
+    stats.make_unmake_seconds += time.perf_counter() - start
+
+
+def _store(tt, key, depth, score, best_move, alpha, beta):
+    if score <= alpha:
+        flag = UPPER
+    elif score >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    tt.store(key, depth, score, flag, best_move)
+
+
+# Search the principal-variation move, then the transposition-table move, before the rest
+def _order_first(moves, pv, tt_move):
+    first = []
+    for preferred in (pv[0] if pv else None, tt_move):
+        if preferred is None:
+            continue
+        for entry in moves:
+            if entry[0] == preferred and entry not in first:
+                first.append(entry)
+                break
+    if not first:
+        return moves
+    return first + [entry for entry in moves if entry not in first]
+
+
+def _child_pv(pv, move):
+    return pv[1:] if pv and pv[0] == move else None
+
+
+# Walk the stored best moves from the root to recover the line the last search expects
+def principal_variation(position, max_player, tt, depth):
+    pv = []
+    tokens = []
+    for _ in range(depth):
+        entry = tt.get(position.zobrist_key(WHITE if max_player else RED))
+        if entry is None or entry[4] is None:
+            break
+        pv.append(entry[4])
+        tokens.extend(position.make_move(step) for step in entry[4])
+        max_player = not max_player
+    for token in reversed(tokens):
+        position.unmake_move(token)
+    return pv
+
+
+# Deepen one ply at a time until the time budget runs out and answer with the
+# best move of the deepest iteration that finished. Returns (score, move, depth).
+def iterative_deepening(position, max_player, time_budget_ms, max_depth=64, tt=None, ordering=None,
+                        weights=None, tablebase=None, stats=None, stop=None, quiescence_nodes=QUIESCENCE_NODES):
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    if tt is None:
+        tt = TranspositionTable()
+    if ordering is None:
+        ordering = MoveOrdering()
+    best_score, best_move, completed = None, None, 0
+    pv = []
+    for depth in range(1, max_depth + 1):
+        try:
+            score, move = minimax(position, depth, max_player, tt=tt, deadline=deadline, pv=pv,
+                                  ordering=ordering, weights=weights, tablebase=tablebase, stats=stats,
+                                  stop=stop, quiescence_nodes=quiescence_nodes)
+        except SearchTimeout:
+            break
+        best_score, best_move, completed = score, move, depth
+        if stats is not None:
+            stats.iteration(depth)
+        if move is None:
+            break
+        pv = principal_variation(position, max_player, tt, depth)
+
+    if best_move is None and completed == 0:
+        # Not even one ply fit in the budget: play the first legal move
+        color = WHITE if max_player else RED
+        side = "WHITE" if max_player else "RED"
+        moves = get_all_moves(position, color, position.boost_available[side],
+                              boost_used=not position.boost_available[side])
+        if moves:
+            best_move = moves[0][0]
+        best_score = position.evaluate(weights=weights)
+    return best_score, best_move, completed
+
+
+# Build the board for the move the search picked; the only copy made per AI turn
+def apply_move(board, move):
+    new_board = deepcopy(board)
+    for step in move:
+        new_board.make_move(step)
+    return new_board
+
+ # Get all possible moves for a given color. A capture's extra (twice) turn is not a
+ # move of its own: GameState gives the side the next turn after it is played.
+def get_all_moves(board, color, boost_available=True, boost_used=False):
+    return board.get_side_moves(color, boost_available and not boost_used)
+
+
+def draw_moves(game, board, piece):
+    import pygame
+    from checkers.piece import square_center
+    valid_moves = board.get_valid_moves(piece)
+    board.draw(game.win)
+    pygame.draw.circle(game.win, (0, 255, 0), square_center(piece.row, piece.col), 50, 5)
+    game.draw_valid_moves(valid_moves.keys())
+    pygame.display.update()
@@ -0,0 +1,57 @@
+
+class MoveOrdering:
+    # Move-ordering state for one search: killer moves per ply and a history table.
+    # With enabled=False moves keep get_all_moves order, so the two can be compared
+    # through the same node and cutoff counters.
+    def __init__(self, enabled=True, killer_slots=2):
+        self.enabled = enabled
+        self.killer_slots = killer_slots
+        self.killers = {}
+        self.history = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order(self, position, moves, ply):
+        if not self.enabled:
+            return moves
+        killers = self.killers.get(ply, ())
+        promotion_row = position.geometry.promotion_row
+
+        def score(entry):
+            move = entry[0]
+            captured = sum(len(skip) for _, _, skip, _ in move)
+            if captured:
+                return (3, captured)
+            start, end = move[0][0], move[0][1]
+            if promotion_row[end[0]] and not position.is_king(*start):
+                return (2, 0)
+            if move in killers:
+                return (1, 0)
+            return (0, self.history.get(move, 0))
+
+        return sorted(moves, key=score, reverse=True)
+
+    def record_cutoff(self, move, ply, depth, first):
+        self.cutoffs += 1
+        if first:
+            self.first_move_cutoffs += 1
+        if any(skip for _, _, skip, _ in move):
+            return
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.killer_slots:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "nodes": self.nodes,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+        }
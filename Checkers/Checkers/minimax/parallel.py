@@ -0,0 +1,228 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from checkers.board import Board
+from .algorithm import (QUIESCENCE_NODES, SearchTimeout, minimax, iterative_deepening, get_all_moves, apply_move,
+                        RED, WHITE)
+from .ordering import MoveOrdering
+from .transposition import TranspositionTable
+
+# Per-process state, set up once by the pool initializer
+_shared_bound = None
+_bound_lock = None
+_stop = None
+_worker_tt = None
+
+
+class _SharedFlag:
+    # A multiprocessing.Value seen as the stop event minimax() checks at every node
+    def __init__(self, value):
+        self.value = value
+
+    def is_set(self):
+        return bool(self.value.value)
+
+
+def _init_worker(shared_bound, bound_lock, stop_flag, tt_size):
+    global _shared_bound, _bound_lock, _stop, _worker_tt
+    _shared_bound = shared_bound
+    _bound_lock = bound_lock
+    _stop = _SharedFlag(stop_flag)
+    _worker_tt = TranspositionTable(tt_size) if tt_size else None
+
+
+# Search one root move. With bounded, the best bound any worker has found so far is its
+# window and a better result is published so the other workers can cut off against it.
+# Returns (value, exact): a bounded result that does not beat the bound is only a bound
+# on the move's value (fail-soft), so it may equal the best value without being as good.
+# deadline is a time.time() value, since perf_counter() is not shared between processes.
+def _search_root_move(position, move, bounded, depth, max_player, deadline, weights, tablebase, quiescence_nodes):
+    for step in move:
+        position.make_move(step)
+    alpha, beta = float('-inf'), float('inf')
+    if bounded:
+        if max_player:
+            alpha = _shared_bound.value
+        else:
+            beta = _shared_bound.value
+    if deadline is not None:
+        deadline = time.perf_counter() + deadline - time.time()
+    value = minimax(position, depth - 1, not max_player, alpha, beta, tt=_worker_tt, deadline=deadline,
+                    weights=weights, tablebase=tablebase, stop=_stop, quiescence_nodes=quiescence_nodes)[0]
+    exact = value > alpha if max_player else value < beta
+    if exact:
+        with _bound_lock:
+            if (value > _shared_bound.value) if max_player else (value < _shared_bound.value):
+                _shared_bound.value = value
+    return value, exact or not bounded
+
+
+class ParallelSearch:
+    # Root-split search: the moves of the root position are spread over a process pool
+    # that shares the current alpha (or beta, for the minimizing side) bound. Workers keep
+    # their own transposition tables between searches; tt and stats are only used by
+    # searches run in this process.
+    # With workers=1 everything runs in this process through minimax() and
+    # iterative_deepening(), which gives exactly their results.
+    def __init__(self, workers=None, tt_size=1 << 16):
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_size = tt_size
+        self.executor = None
+        if self.workers > 1:
+            self.shared_bound = multiprocessing.Value('d', 0.0, lock=False)
+            self.bound_lock = multiprocessing.Lock()
+            self.stop_flag = multiprocessing.Value('b', 0, lock=False)
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.shared_bound, self.bound_lock, self.stop_flag, tt_size),
+            )
+
+    # (score, move) of a fixed-depth search, as minimax() answers it. Setting stop
+    # (a threading.Event) raises SearchTimeout.
+    def search(self, position, depth, max_player, tt=None, weights=None, tablebase=None, stats=None, stop=None,
+               quiescence_nodes=QUIESCENCE_NODES):
+        moves = self._root_moves(position, max_player)
+        if self.executor is None or depth < 2 or not moves:
+            return minimax(position, depth, max_player, tt=tt, weights=weights, tablebase=tablebase, stats=stats,
+                           stop=stop, quiescence_nodes=quiescence_nodes)
+        return self._search_root(position, moves, depth, max_player, None, stop,
+                                 (weights, tablebase, quiescence_nodes))
+
+    # (score, move, depth) of a search deepened one ply at a time within the budget, as
+    # iterative_deepening() answers it. Each depth searches the previous best move first.
+    def iterative_deepening(self, position, max_player, time_budget_ms, max_depth=64, tt=None, weights=None,
+                            tablebase=None, stats=None, stop=None, quiescence_nodes=QUIESCENCE_NODES):
+        moves = self._root_moves(position, max_player)
+        if self.executor is None or not moves:
+            return iterative_deepening(position, max_player, time_budget_ms, max_depth, tt=tt, weights=weights,
+                                       tablebase=tablebase, stats=stats, stop=stop,
+                                       quiescence_nodes=quiescence_nodes)
+        deadline = time.time() + time_budget_ms / 1000
+        best_score, best_move, completed = position.evaluate(weights=weights), moves[0], 0
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self._search_root(position, moves, depth, max_player, deadline, stop,
+                                                (weights, tablebase, quiescence_nodes))
+            except SearchTimeout:
+                break
+            best_score, best_move, completed = score, move, depth
+            moves = [move] + [other for other in moves if other != move]
+        return best_score, best_move, completed
+
+    def _root_moves(self, position, max_player):
+        if position.winner() is not None:
+            return []
+        color, side = (WHITE, "WHITE") if max_player else (RED, "RED")
+        moves = get_all_moves(position, color, position.boost_available[side],
+                              boost_used=not position.boost_available[side])
+        return [move for move, _ in MoveOrdering().order(position, moves, 0)]
+
+    def _search_root(self, position, moves, depth, max_player, deadline, stop, options):
+        self.stop_flag.value = 0
+        self.shared_bound.value = float('-inf') if max_player else float('inf')
+        args = (depth, max_player, deadline) + options
+        results = self._collect({self.executor.submit(_search_root_move, position, move, True, *args): i
+                                 for i, move in enumerate(moves)}, stop)
+        # Bounded results are no better than the best exact one. Those that tie it are
+        # searched again with a full window, so that ties go to the earlier move as in a
+        # sequential search.
+        exact = [value for value, is_exact in results.values() if is_exact]
+        best = (max if max_player else min)(exact, default=None)
+        results.update(self._collect({self.executor.submit(_search_root_move, position, moves[i], False, *args): i
+                                      for i, (value, is_exact) in results.items()
+                                      if not is_exact and (best is None or value == best)}, stop))
+        best_index = None
+        for i in range(len(moves)):
+            value, is_exact = results[i]
+            if not is_exact:
+                continue
+            if best_index is None or (value > results[best_index][0] if max_player else value < results[best_index][0]):
+                best_index = i
+        return results[best_index][0], moves[best_index]
+
+    # Results of futures (mapped to root move indices). If one fails or stop is set, the
+    # workers still on this search are stopped before the exception goes on, so that the
+    # next search starts with every worker free.
+    def _collect(self, futures, stop):
+        results = {}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.05 if stop is not None else None,
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[futures[future]] = future.result()
+                if stop is not None and stop.is_set():
+                    raise SearchTimeout()
+        except BaseException:
+            self.stop_flag.value = 1
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            raise
+        return results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Fixed positions for the speedup report: the opening and the positions reached
+# after a few plies of deterministic depth-2 self-play.
+def report_positions(plies=(0, 6, 12)):
+    positions = []
+    board = Board()
+    max_player = False
+    for ply in range(max(plies) + 1):
+        if ply in plies:
+            positions.append((board, max_player))
+        _, move = minimax(board, 2, max_player)
+        if move is None:
+            break
+        board = apply_move(board, move)
+        max_player = not max_player
+    return positions
+
+
+# Time of a depth-limited search of every position per worker count, relative to the
+# first count. No transposition table is used on either path, as the in-process search
+# gets none, and the pool is started with a throwaway search before the clock starts, so
+# that only the root split is measured.
+def speedup_report(depth, worker_counts, positions=None):
+    positions = positions or report_positions()
+    rows = []
+    baseline = None
+    for workers in worker_counts:
+        with ParallelSearch(workers, tt_size=0) as search:
+            board, max_player = positions[0]
+            search.search(board, 2, max_player)
+            start = time.perf_counter()
+            for board, max_player in positions:
+                search.search(board, depth, max_player)
+            elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed
+        rows.append({"workers": workers, "depth": depth, "positions": len(positions),
+                     "seconds": round(elapsed, 3), "speedup": round(baseline / elapsed, 2)})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel root search speedup report")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    for row in speedup_report(args.depth, args.workers):
+        print(json.dumps(row))
@@ -0,0 +1,116 @@
+import argparse
+import cProfile
+import json
+import time
+
+
+class SearchStats:
+    # Counters and timers for one AI move. minimax only touches them when it is given
+    # a SearchStats, so a search without one runs exactly as before.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.quiescence_nodes = 0
+        self.cutoffs = {}
+        self.iteration_nodes = []
+        self.depth = 0
+        self.movegen_seconds = 0.0
+        self.make_unmake_seconds = 0.0
+        self.evaluate_seconds = 0.0
+        self.book_probes = self.book_hits = 0
+        self.tablebase_probes = self.tablebase_hits = 0
+        self.tt_probes = self.tt_hits = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def cutoff(self, ply):
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+
+    # Called after each finished iteration of iterative deepening (or the one fixed-depth search)
+    def iteration(self, depth):
+        self.depth = depth
+        self.iteration_nodes.append(self.nodes - sum(self.iteration_nodes))
+
+    # Start/stop around the search; the transposition table's counters are read as deltas
+    def start(self, tt=None):
+        self.reset()
+        if tt is not None:
+            self.tt_probes, self.tt_hits = -tt.probes, -tt.hits
+
+    def stop(self, tt=None):
+        self.seconds = time.perf_counter() - self.started
+        if tt is not None:
+            self.tt_probes += tt.probes
+            self.tt_hits += tt.hits
+        else:
+            self.tt_probes = self.tt_hits = 0
+
+    # Nodes of the last iteration over the one before, or the depth-th root of the
+    # node count when only one search ran
+    @property
+    def effective_branching_factor(self):
+        counts = [n for n in self.iteration_nodes if n]
+        if len(counts) >= 2:
+            return counts[-1] / counts[-2]
+        if counts and self.depth:
+            return counts[-1] ** (1 / self.depth)
+        return 0.0
+
+    def record(self, **extra):
+        record = {
+            "depth": self.depth,
+            "seconds": round(self.seconds, 6),
+            "nodes": self.nodes,
+            "nodes_per_sec": round(self.nodes / self.seconds) if self.seconds else 0,
+            "leaf_evals": self.leaf_evals,
+            "quiescence_nodes": self.quiescence_nodes,
+            "cutoffs_per_ply": {str(ply): count for ply, count in sorted(self.cutoffs.items())},
+            "iteration_nodes": self.iteration_nodes,
+            "effective_branching_factor": round(self.effective_branching_factor, 3),
+            "movegen_seconds": round(self.movegen_seconds, 6),
+            "make_unmake_seconds": round(self.make_unmake_seconds, 6),
+            "evaluate_seconds": round(self.evaluate_seconds, 6),
+            "tt_probes": self.tt_probes,
+            "tt_hit_rate": self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+            "book_probes": self.book_probes,
+            "book_hit_rate": self.book_hits / self.book_probes if self.book_probes else 0.0,
+            "tablebase_probes": self.tablebase_probes,
+            "tablebase_hit_rate": self.tablebase_hits / self.tablebase_probes if self.tablebase_probes else 0.0,
+        }
+        record.update(extra)
+        return record
+
+
+# Run fn under cProfile and write the profile to path (view it with snakeviz, or turn it
+# into a flamegraph with flameprof). Returns fn's result.
+def profile_call(path, fn, *args, **kwargs):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+
+
+if __name__ == "__main__":
+    from checkers.constants import RED, WHITE
+    from checkers.engine.perft import load_state
+    from checkers.engine.search import search
+    from minimax.transposition import TranspositionTable
+
+    parser = argparse.ArgumentParser(description="Search statistics (and optionally a profile) for one AI move")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--time-ms", type=int, default=None, help="iterative deepening budget instead of --depth")
+    parser.add_argument("--diagram", default=None, help="file with one row per line (r/w/R/W/.)")
+    parser.add_argument("--turn", choices=["RED", "WHITE"], default="WHITE")
+    parser.add_argument("--profile", default=None, help="write a cProfile dump of the move to this file")
+    args = parser.parse_args()
+
+    state = load_state(args.diagram, RED if args.turn == "RED" else WHITE)
+    stats = SearchStats()
+    tt = TranspositionTable()
+    run = lambda: search(state, args.depth, args.time_ms, tt, stats=stats)
+    score, move, depth = profile_call(args.profile, run) if args.profile else run()
+    print(json.dumps(stats.record(score=score, move=move)))
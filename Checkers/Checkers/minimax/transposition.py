@@ -0,0 +1,61 @@
+# Bound types stored with each entry
+EXACT, LOWER, UPPER = 0, 1, 2
+
+REPLACE_DEPTH = "depth"
+REPLACE_ALWAYS = "always"
+
+
+class TranspositionTable:
+    def __init__(self, size=1 << 16, replacement=REPLACE_DEPTH):
+        if replacement not in (REPLACE_DEPTH, REPLACE_ALWAYS):
+            raise ValueError(f"unknown replacement policy: {replacement}")
+        self.size = size
+        self.replacement = replacement
+        self.clear()
+
+    def clear(self):
+        # entry: (key, depth, score, flag, best_move)
+        self.entries = [None] * self.size
+        self.used = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    # Lookup that leaves the probe/hit counters alone, for walking the principal variation
+    def get(self, key):
+        entry = self.entries[key % self.size]
+        return entry if entry is not None and entry[0] == key else None
+
+    def store(self, key, depth, score, flag, best_move):
+        index = key % self.size
+        existing = self.entries[index]
+        if existing is None:
+            self.used += 1
+        elif self.replacement == REPLACE_DEPTH and existing[0] != key and existing[1] > depth:
+            # keep the deeper result for a different position
+            return
+        self.entries[index] = (key, depth, score, flag, best_move)
+        self.stores += 1
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "used": self.used,
+            "fill": self.used / self.size,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate,
+            "stores": self.stores,
+        }
@@ -0,0 +1,18 @@
+import random
+
+from checkers.engine.state import GameState
+
+
+# count games still in progress after 4 to 29 seeded random plies
+def midgame_states(count=4, seed=5):
+    rng = random.Random(seed)
+    states = []
+    while len(states) < count:
+        state = GameState()
+        for _ in range(rng.randrange(4, 30)):
+            if state.winner() is not None:
+                break
+            state.apply(rng.choice(state.legal_moves()))
+        if state.winner() is None:
+            states.append(state)
+    return states
@@ -0,0 +1,35 @@
+import pytest
+
+from checkers.engine.state import GameState
+from tests.helpers import midgame_states
+
+pytest.importorskip("numpy")
+from checkers.batch import BatchEvaluator, apply_encoded, encode, encode_boost  # noqa: E402
+
+
+def boards():
+    states = [GameState()] + midgame_states(8, seed=11)
+    states[-1].board.boost_available["WHITE"] = False
+    return [state.board for state in states]
+
+
+def test_batch_evaluator_matches_board_evaluate():
+    positions = boards()
+    for weights in (None, {"king": 2.5, "hole": 0.75, "boost": 0.3}):
+        evaluator = BatchEvaluator(weights)
+        scores = evaluator.evaluate_boards(positions)
+        for board, score in zip(positions, scores):
+            assert score == pytest.approx(board.evaluate(weights=evaluator.weights))
+
+
+def test_apply_encoded_matches_encode_after_the_move():
+    for state in [GameState()] + midgame_states(8, seed=11):
+        board = state.board
+        position, boost = encode(board), encode_boost(board.boost_available)
+        for move, _ in board.get_side_moves(state.turn, state.boost_available(state.turn)):
+            child, child_boost = apply_encoded(position, boost, move)
+            tokens = [board.make_move(step) for step in move]
+            assert (child == encode(board)).all()
+            assert child_boost == encode_boost(board.boost_available)
+            for token in reversed(tokens):
+                board.unmake_move(token)
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from checkers.board import Board
+from checkers.constants import RED, WHITE
+from checkers.engine.search import search, search_position
+from checkers.engine.state import GameState
+from checkers.geometry import DEFAULT_GEOMETRY, get_geometry
+
+# The standard board, plain 8x8 draughts and a 12x12 board with holes in the middle
+GEOMETRIES = [DEFAULT_GEOMETRY, get_geometry(8, 8, [], 3), get_geometry(12, 12, [(5, 2), (6, 3), (5, 8), (6, 9)], 4)]
+
+
+# Every position of a few seeded random games, as (state, legal steps) before each ply
+def random_positions(geometry=DEFAULT_GEOMETRY, games=4, max_plies=120):
+    for seed in range(games):
+        rng = random.Random(seed)
+        state = GameState(Board(geometry))
+        for _ in range(max_plies):
+            if state.winner() is not None:
+                break
+            steps = state.legal_moves()
+            yield state, steps
+            state.apply(rng.choice(steps))
+
+
+def snapshot(board):
+    return (board.to_rows(), dict(board.boost_available), board.hash, board.evaluate(),
+            board.red_left, board.white_left, board.red_kings, board.white_kings, board.hole_balance,
+            {color: sorted((p.row, p.col, p.king) for p in pieces) for color, pieces in board.pieces.items()})
+
+
+@pytest.mark.parametrize("geometry", GEOMETRIES)
+def test_unmake_restores_every_child(geometry):
+    for state, steps in random_positions(geometry):
+        board = state.board
+        before = snapshot(board)
+        for step in steps:
+            token = board.make_move(step)
+            assert board.evaluate() == board.full_evaluate()
+            board.unmake_move(token)
+            assert snapshot(board) == before
+
+
+@pytest.mark.parametrize("geometry", GEOMETRIES)
+def test_hash_matches_a_board_built_from_scratch(geometry):
+    for state, _ in random_positions(geometry):
+        board = state.board
+        fresh = Board.from_rows(board.to_rows(), board.boost_available, geometry)
+        assert board.hash == fresh.hash
+        assert board.zobrist_key(state.turn) == fresh.zobrist_key(state.turn)
+        assert board.evaluate() == fresh.evaluate()
+
+
+# Moves of color one piece at a time through get_valid_moves, as get_side_moves orders them
+def moves_by_piece(board, color, allow_boost):
+    moves = []
+    for piece in board.get_all_pieces(color):
+        start = (piece.row, piece.col)
+        valid = board.get_valid_moves(piece)
+        for end, skipped in valid.items():
+            moves.append((((start, end, tuple((p.row, p.col) for p in skipped), False),), False))
+        if allow_boost:
+            for end in board.get_valid_moves(piece, allow_boost=True):
+                if end not in valid:
+                    moves.append((((start, end, (), True),), True))
+    return moves
+
+
+@pytest.mark.parametrize("geometry", GEOMETRIES)
+def test_side_moves_match_moves_by_piece(geometry):
+    for state, _ in random_positions(geometry):
+        board = state.board
+        for color in (RED, WHITE):
+            for allow_boost in (False, True):
+                moves = board.get_side_moves(color, allow_boost)
+                assert moves == moves_by_piece(board, color, allow_boost)
+                assert board.has_any_legal_move(color, allow_boost) == bool(moves)
+
+
+def test_geometry_sets_up_the_board():
+    board = Board(get_geometry(8, 8, [], 3))
+    assert (board.red_left, board.white_left) == (12, 12)
+    assert board.to_rows()[:3] == [".w.w.w.w", "w.w.w.w.", ".w.w.w.w"]
+    # no capture is possible in the first two plies, so these are the draughts counts
+    replies = []
+    for (step,), _ in board.get_side_moves(RED):
+        token = board.make_move(step)
+        replies.append(len(board.get_side_moves(WHITE)))
+        board.unmake_move(token)
+    assert replies == [7] * 7
+
+    holed = GEOMETRIES[2]
+    board = Board(holed)
+    assert board.red_left == board.white_left == 24
+    assert all(board.get_piece(*hole) is None for hole in holed.holes)
+
+
+@pytest.mark.parametrize("geometry", GEOMETRIES[1:])
+def test_search_plays_legal_moves_on_other_geometries(geometry):
+    for state, steps in random_positions(geometry, games=1, max_plies=30):
+        assert search_position(state.board) is state.board
+        _, move, _ = search(state, depth=2)
+        assert move[0] in steps
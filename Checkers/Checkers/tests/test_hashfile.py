@@ -0,0 +1,21 @@
+from checkers.engine.hashfile import SortedHashFile, merge_sorted, write_sorted
+
+MAGIC = b"TEST"
+
+
+def test_merge_streams_sorted_sources(tmp_path):
+    paths = []
+    for n, records in enumerate([[(5, (1,)), (1, (1,))], [(3, (2,)), (5, (2,))], [(2, (3,))]]):
+        paths.append(str(tmp_path / f"part{n}.bin"))
+        write_sorted(paths[-1], MAGIC, "h", records)
+    tables = [SortedHashFile(path, MAGIC, "h") for path in paths]
+    out = str(tmp_path / "merged.bin")
+    merge_sorted(out, MAGIC, "h", [table.items() for table in tables])
+    for table in tables:
+        table.close()
+
+    with SortedHashFile(out, MAGIC, "h") as merged:
+        # key 5 is in two sources and the later one wins
+        assert list(merged.items()) == [(1, (1,)), (2, (3,)), (3, (2,)), (5, (2,))]
+        assert merged.get(3) == (2,)
+        assert merged.get(4) is None
@@ -0,0 +1,34 @@
+from checkers.constants import WHITE
+from checkers.engine.search import search, search_position
+from minimax.algorithm import minimax
+from minimax.parallel import ParallelSearch
+from minimax.transposition import TranspositionTable
+from tests.helpers import midgame_states
+
+
+def test_one_worker_matches_minimax():
+    with ParallelSearch(1) as parallel:
+        for state in midgame_states():
+            max_player = state.turn == WHITE
+            for depth in (1, 2, 3):
+                expected = minimax(state.board, depth, max_player, tt=TranspositionTable())
+                assert parallel.search(state.board, depth, max_player, tt=TranspositionTable()) == expected
+
+
+def test_workers_match_minimax_without_worker_tables():
+    # Without transposition tables every exact root value is the plain minimax value,
+    # and ties go to the earlier root move as in the sequential search
+    with ParallelSearch(2, tt_size=0) as parallel:
+        for state in midgame_states():
+            position = search_position(state.board)
+            max_player = state.turn == WHITE
+            for depth in (2, 3):
+                assert parallel.search(position, depth, max_player) == minimax(position, depth, max_player)
+
+
+def test_engine_search_with_workers():
+    state = midgame_states(1)[0]
+    with ParallelSearch(2) as parallel:
+        score, move, depth = search(state, time_budget_ms=200, parallel=parallel)
+    assert depth >= 1
+    assert move[0] in state.legal_moves()
@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from checkers.board import Board
+from checkers.engine.search import search
+from checkers.engine.state import GameState
+from minimax.algorithm import SearchTimeout, minimax, quiescence
+from minimax.stats import SearchStats
+
+# WHITE to move can capture the man in front of it
+EXCHANGE = [
+    "..........",
+    "..w.......",
+    "...r......",
+    "..........",
+    "..........",
+    "..........",
+    "..........",
+    "..........",
+    "...r......",
+    "..........",
+]
+
+
+def test_quiescence_resolves_captures_past_the_leaf():
+    board = Board.from_rows(EXCHANGE)
+    assert minimax(board, 0, True, quiescence_nodes=0)[0] == board.evaluate()
+    assert quiescence(board, True, float('-inf'), float('inf')) > board.evaluate()
+
+
+def test_stats_time_quiescence_leaves():
+    stats = SearchStats()
+    search(GameState(), depth=3, stats=stats)
+    assert stats.quiescence_nodes > 0
+    assert stats.evaluate_seconds > 0
+    assert stats.movegen_seconds > 0
+    assert stats.make_unmake_seconds > 0
+
+
+def test_stop_ends_quiescence():
+    stop = threading.Event()
+    stop.set()
+    with pytest.raises(SearchTimeout):
+        quiescence(Board.from_rows(EXCHANGE), True, float('-inf'), float('inf'), stop=stop)
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from checkers.board import Board
+from checkers.engine.record import GameRecorder, RecordError, RecordWriter, read_games, record_interval, replay
+from checkers.engine.state import GameState
+from checkers.geometry import get_geometry
+
+
+# (recorder, [(step, use_twice)], winner) of a random game
+def random_game(seed, interval, max_plies=80):
+    rng = random.Random(seed)
+    state = GameState()
+    recorder = GameRecorder(interval)
+    plies = []
+    while len(plies) < max_plies and state.winner() is None:
+        step = rng.choice(state.legal_moves())
+        use_twice = state.can_use_twice(step) and rng.random() < 0.5
+        state.apply(step, use_twice)
+        recorder.add(state, step, use_twice)
+        plies.append((step, use_twice))
+    return recorder, plies, state.winner()
+
+
+def test_written_games_replay_move_for_move(tmp_path):
+    path = str(tmp_path / "games.ckr")
+    games = [random_game(seed, 4) for seed in range(3)]
+    with RecordWriter(path, 4) as writer:
+        for recorder, _, winner in games:
+            writer.write_game(recorder, winner)
+
+    assert record_interval(path) == 4
+    assert [len(moves) for _, moves, _ in read_games(path)] == [len(plies) for _, plies, _ in games]
+    # replay checks the position key after every fourth ply as it goes
+    replayed = [[] for _ in games]
+    for game, _, _, step, use_twice in replay(path):
+        replayed[game].append((step, use_twice))
+    assert replayed == [plies for _, plies, _ in games]
+
+
+def test_writer_keeps_the_interval_of_an_existing_file(tmp_path):
+    path = str(tmp_path / "games.ckr")
+    with RecordWriter(path, 4) as writer:
+        writer.write_game(random_game(0, 4)[0])
+    with RecordWriter(path, 16) as writer:
+        assert writer.interval == 4
+        with pytest.raises(RecordError):
+            writer.write_game(random_game(1, 16)[0])
+        writer.write_game(random_game(1, writer.interval)[0])
+    assert len(list(read_games(path))) == 2
+
+
+def test_only_standard_board_games_are_recorded():
+    state = GameState(Board(get_geometry(12, 12, [], 3)))
+    step = state.legal_moves()[0]
+    state.apply(step)
+    with pytest.raises(RecordError):
+        GameRecorder().add(state, step)
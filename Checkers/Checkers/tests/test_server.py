@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+from checkers.engine.server import GameServer, LocalClient, _search_worker
+
+
+def _failing_worker(*args):
+    raise RuntimeError("search exploded")
+
+
+def _crashing_worker(*args):
+    os._exit(1)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_human_move_and_ai_reply():
+    async def play():
+        server = GameServer(workers=1, default_time_budget_ms=20)
+        try:
+            client = LocalClient(server)
+            assert (await client.new_game())["ok"]
+            assert (await client.move((7, 0), (5, 0)))["error"] == "illegal move"
+            reply = await client.move((7, 0), (6, 1))
+            assert reply["ok"] and reply["state"]["turn"] == "WHITE"
+            assert (await client.move((7, 2), (6, 3)))["error"] == "not your turn"
+            assert (await client.next_state(10))["turn"] == "WHITE"
+            assert (await client.next_state(10))["turn"] == "RED"
+            metrics = await client.metrics()
+            assert metrics["searches"] == 1 and metrics["search_errors"] == 0
+        finally:
+            server.close()
+
+    run(play())
+
+
+def test_failing_worker_ends_game_with_error():
+    async def play():
+        server = GameServer(workers=1, search_worker=_failing_worker, search_retries=1)
+        try:
+            client = LocalClient(server)
+            await client.new_game(ai=("RED",))
+            first = await client.next_event(10)
+            assert first["event"] == "error" and "search exploded" in first["error"]
+            assert first["state"]["error"] is None
+            second = await client.next_event(10)
+            assert second["event"] == "error" and second["state"]["error"] == second["error"]
+            reply = await client.move((2, 1), (3, 0))
+            assert not reply["ok"] and reply["error"].startswith("game ended")
+            assert (await client.metrics())["search_errors"] == 2
+            assert server.sessions[client.session].ai_task is None
+        finally:
+            server.close()
+
+    run(play())
+
+
+def test_crashed_worker_pool_is_replaced():
+    async def play():
+        server = GameServer(workers=1, search_worker=_crashing_worker, search_retries=0)
+        try:
+            crashed = LocalClient(server)
+            await crashed.new_game(ai=("RED",))
+            event = await crashed.next_event(10)
+            assert event["event"] == "error" and "BrokenProcessPool" in event["error"]
+            assert server.metrics()["pool_restarts"] == 1
+
+            server.search_worker = _search_worker
+            client = LocalClient(server)
+            await client.new_game(ai=("RED",), time_budget_ms=20)
+            state = await client.next_state(10)
+            assert state["turn"] == "WHITE" and state["plies"] == 1
+        finally:
+            server.close()
+
+    run(play())
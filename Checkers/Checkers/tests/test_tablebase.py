@@ -0,0 +1,27 @@
+from checkers.board import Board
+from checkers.constants import RED, WHITE
+from checkers.engine.tablebase import Tablebase, build_tablebase, merge_slices, slice_waves, solve_slice
+
+EMPTY = "." * 10
+
+
+def test_tablebase_reads_its_piece_count_from_the_file(tmp_path):
+    directory, out = str(tmp_path / "slices"), str(tmp_path / "endgame.bin")
+    build_tablebase(2, directory, out, workers=1, log=lambda line: None)
+    two = Board.from_rows([EMPTY] * 4 + ["...R......"] + [EMPTY] * 2 + ["..w......."] + [EMPTY] * 2)
+    three = Board.from_rows([EMPTY] * 4 + ["...R......"] + [EMPTY] * 2 + ["..W...W..."] + [EMPTY] * 2)
+    table = Tablebase(out)
+    assert table.max_pieces == 2
+    assert table.probe(two, RED) is not None
+    assert table.probe(three, RED) is None
+    table.close()
+
+    # Kings only, so the slice needs nothing but the 2-piece slices above
+    material = (0, 1, 0, 2)
+    solve_slice(material, directory)
+    merge_slices([m for wave in slice_waves(2) for m in wave] + [material], directory, out, 3)
+    table = Tablebase(out)
+    assert table.max_pieces == 3
+    assert table.probe(three, RED) is not None
+    assert table.probe(three, WHITE) is not None
+    table.close()
@@ -0,0 +1,30 @@
+from checkers.engine.tune import MIN_UNITS, SCALES, spsa
+from checkers.engine.weights import load_weights
+
+
+# A match that the weights closer to target always win, standing in for self-play
+def closer_wins(target):
+    def distance(weights):
+        return sum(((weights[name] - target[name]) / SCALES[name]) ** 2 for name in target)
+
+    def match(plus, minus, k):
+        won = distance(plus) < distance(minus)
+        return {"a_win_rate": float(won), "b_win_rate": float(not won), "games_per_sec": 0.0}
+    return match
+
+
+def test_spsa_converges_on_a_known_optimum(tmp_path):
+    target = {"king": 1.0, "hole": 0.3, "boost": 0.05}
+    out = str(tmp_path / "weights.json")
+    weights = spsa(iterations=300, out_path=out, log=lambda line: None, match=closer_wins(target))
+    for name, value in target.items():
+        assert abs(weights[name] - value) < SCALES[name] / 2, (name, weights)
+    assert load_weights(out) == weights
+
+
+def test_weights_stay_above_the_floor(tmp_path):
+    target = {"king": 1.0, "hole": -1.0, "boost": 0.2}
+    weights = spsa(iterations=100, out_path=str(tmp_path / "weights.json"), log=lambda line: None,
+                   match=closer_wins(target))
+    assert weights["hole"] == MIN_UNITS * SCALES["hole"]
+    assert all(value > 0 for value in weights.values())